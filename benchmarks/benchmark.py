@@ -0,0 +1,248 @@
+#!/usr/bin/python3
+import argparse
+import datetime
+import http.server
+import json
+import os
+import platform
+import shutil
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from argo_probe_xml.xml import XML
+from lxml import etree
+
+CHECK_XML = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src", "check_xml"
+)
+
+XPATHS = {
+    "update": "/bench/lastUpdate",
+    "jobs": "/bench/{levels}partition/running_jobs",
+    "state": "/bench/{levels}partition/state_up",
+    "updated": "/bench/{levels}partition/updated"
+}
+
+
+def generate(filename, nodes, depth):
+    updated = (datetime.datetime.utcnow() - datetime.timedelta(minutes=5))\
+        .strftime("%Y-%m-%d %H:%M:%S")
+
+    with open(filename, "w") as f:
+        f.write(f"<bench><lastUpdate>{int(time.time())}</lastUpdate>")
+        f.write("<level>" * depth)
+        for i in range(nodes):
+            f.write(
+                f"<partition>"
+                f"<running_jobs>{i % 100}</running_jobs>"
+                f"<name>partition{i}</name>"
+                f"<state_up>up</state_up>"
+                f"<updated>{updated}</updated>"
+                f"</partition>"
+            )
+
+        f.write("</level>" * depth)
+        f.write("</bench>")
+
+    return os.path.getsize(filename)
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    def translate_path(self, path):
+        return os.path.join(
+            self.server.directory, os.path.basename(path.split("?")[0])
+        )
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+def serve(directory):
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.directory = directory
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings)
+    }
+
+
+def run_probe(args, repeat):
+    timings = []
+    rss = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, CHECK_XML] + args,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = status >> 8
+        timings.append(time.perf_counter() - start)
+        # ru_maxrss is in kilobytes on Linux
+        rss.append(rusage.ru_maxrss * 1024)
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "peak_rss": max(rss),
+        "code": process.returncode
+    }
+
+
+def get_xpaths(depth):
+    levels = "level/" * depth
+
+    return dict(
+        (key, value.format(levels=levels)) for key, value in XPATHS.items()
+    )
+
+
+def benchmark_probe(url, xpaths, repeat):
+    args = [
+        "-u", url, "-t", "60",
+        "-x", xpaths["update"], xpaths["jobs"], xpaths["state"],
+        xpaths["updated"],
+        "-c", "running_jobs:0:100", "--ok", "state_up:up",
+        "--age", "updated:1", "--time-format", "%Y-%m-%d %H:%M:%S"
+    ]
+
+    return {
+        "check_xml": run_probe(args, repeat),
+        "check_xml_stream": run_probe(args + ["--stream"], repeat)
+    }
+
+
+def benchmark_xml(url, xpaths, repeat):
+    result = dict()
+
+    xml = XML(url=url, timeout=60)
+    result["get"] = measure(xml._get, repeat)
+
+    data = xml._get()
+    result["parse"] = measure(lambda: xml._build_tree(data), repeat)
+
+    xml = XML(url=url, timeout=60)
+    xml._build_tree(data)
+    result["xpath"] = measure(
+        lambda: xml.parse(xpath=xpaths["jobs"]), repeat
+    )
+    result["equal"] = measure(
+        lambda: xml.equal(xpath=xpaths["state"], value="up"), repeat
+    )
+    result["thresholds"] = measure(
+        lambda: xml._validate_thresholds(
+            xpath=xpaths["jobs"], threshold="0:100"
+        ), repeat
+    )
+    result["check_if_younger"] = measure(
+        lambda: xml.check_if_younger(
+            xpath=xpaths["updated"], age=1, time_format="%Y-%m-%d %H:%M:%S"
+        ), repeat
+    )
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the check_xml probe hot paths"
+    )
+    parser.add_argument(
+        "--nodes", dest="nodes", type=int, nargs="+",
+        default=[10, 1000, 100000],
+        help="Number of repeated nodes in the generated documents "
+             "(default 10 1000 100000)"
+    )
+    parser.add_argument(
+        "--depth", dest="depth", type=int, default=1,
+        help="Number of nested levels above the repeated nodes (default 1)"
+    )
+    parser.add_argument(
+        "--repeat", dest="repeat", type=int, default=5,
+        help="Number of repetitions of each measurement (default 5)"
+    )
+    parser.add_argument(
+        "-o", "--output", dest="output", type=str,
+        help="File to write JSON results to (default stdout)"
+    )
+    args = parser.parse_args()
+
+    startup = run_probe(["-h"], args.repeat)
+
+    directory = tempfile.mkdtemp()
+    server = serve(directory)
+
+    xpaths = get_xpaths(args.depth)
+    results = []
+
+    try:
+        for nodes in args.nodes:
+            filename = f"bench-{nodes}.xml"
+            size = generate(
+                os.path.join(directory, filename), nodes, args.depth
+            )
+            results.append({
+                "nodes": nodes,
+                "depth": args.depth,
+                "bytes": size,
+                "url": f"http://127.0.0.1:{server.server_address[1]}/"
+                       f"{filename}"
+            })
+
+        # peak RSS of a child process includes the RSS of this process at
+        # the time of the fork, so the probe is run before any of the
+        # documents is loaded here
+        for result in results:
+            result.update(benchmark_probe(result["url"], xpaths, args.repeat))
+
+        for result in results:
+            result.update(benchmark_xml(result["url"], xpaths, args.repeat))
+
+    finally:
+        server.shutdown()
+        shutil.rmtree(directory)
+
+    output = json.dumps({
+        "timestamp": datetime.datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "lxml": ".".join(str(item) for item in etree.LXML_VERSION),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "startup": startup,
+        "results": results
+    }, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
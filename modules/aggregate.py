@@ -0,0 +1,65 @@
+import math
+import re
+
+AGGREGATE = re.compile(r"^(sum|avg|min|max|count|p(\d+(\.\d+)?))$")
+
+
+def is_valid(spec):
+    match = AGGREGATE.match(spec)
+    return bool(match) and (
+        match.group(2) is None or float(match.group(2)) <= 100
+    )
+
+
+def _percentile(values, percent):
+    # linear interpolation between the closest ranks
+    values.sort()
+    rank = (len(values) - 1) * percent / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def aggregate(values, spec):
+    if not is_valid(spec):
+        raise ValueError(f"Invalid aggregate function {spec}")
+
+    if spec == "count":
+        return float(len(values))
+
+    if not values:
+        raise ValueError("No values to aggregate")
+
+    # each value is converted to number once, and the aggregate is computed
+    # in the same pass; only the percentiles need all the values
+    numbers = [] if spec.startswith("p") else None
+    total = 0.
+    minimum = math.inf
+    maximum = -math.inf
+    for item in values:
+        value = float(item)
+        total += value
+        if value < minimum:
+            minimum = value
+
+        if value > maximum:
+            maximum = value
+
+        if numbers is not None:
+            numbers.append(value)
+
+    if spec == "sum":
+        return total
+
+    elif spec == "avg":
+        return total / len(values)
+
+    elif spec == "min":
+        return minimum
+
+    elif spec == "max":
+        return maximum
+
+    else:
+        return _percentile(numbers, float(spec[1:]))
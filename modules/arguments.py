@@ -1,3 +1,7 @@
+from argo_probe_xml import aggregate
+from argo_probe_xml.threshold import is_valid
+
+
 class Args:
     def __init__(self, args):
         self.args = args
@@ -5,9 +9,10 @@ class Args:
     def _find_arg(self, name, items):
         if items:
             if len(self.args["xpath"]) > 1:
+                # node names can contain colon themselves (e.g. ns:name)
                 for item in items:
                     if item.startswith(f"{name}:"):
-                        return ":".join(item.split(":")[1:])
+                        return item[len(name) + 1:]
 
             else:
                 return items[0]
@@ -41,7 +46,7 @@ class Args:
         if len(node_names) > 1:
             for arg in [
                 self.args["ok"], self.args["warning"], self.args["critical"],
-                self.args["age"]
+                self.args["age"], self.args.get("aggregate")
             ]:
                 if arg:
                     for item in arg:
@@ -50,8 +55,30 @@ class Args:
 
         return True
 
+    def check_thresholds(self):
+        for xpath in self.args["xpath"]:
+            node_name = xpath.split("/")[-1]
+            for arg in ["warning", "critical"]:
+                threshold = self._find_arg(name=node_name, items=self.args[arg])
+                if threshold and not is_valid(threshold):
+                    return False
+
+        return True
+
+    def check_aggregates(self):
+        for xpath in self.args["xpath"]:
+            node_name = xpath.split("/")[-1]
+            spec = self.aggregate4node(node_name)
+            if spec and (
+                    not aggregate.is_valid(spec) or
+                    self.ok4node(node_name) or self.age4node(node_name)
+            ):
+                return False
+
+        return True
+
     def _arg4node(self, arg, name):
-        return self._find_arg(name, self.args[arg])
+        return self._find_arg(name, self.args.get(arg))
 
     def ok4node(self, name):
         return self._arg4node("ok", name)
@@ -64,3 +91,6 @@ class Args:
 
     def age4node(self, name):
         return self._arg4node("age", name)
+
+    def aggregate4node(self, name):
+        return self._arg4node("aggregate", name)
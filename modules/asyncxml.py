@@ -0,0 +1,194 @@
+import asyncio
+import functools
+import time
+
+from argo_probe_xml.batch import invalid_target, prepare_target
+from argo_probe_xml.compression import Decompressor
+from argo_probe_xml.exceptions import CriticalException
+from argo_probe_xml.probe import check
+from argo_probe_xml.xml import STREAM_CHUNK_SIZE, XML, get_namespaces, \
+    get_path
+from lxml import etree
+from lxml.etree import XMLSyntaxError
+
+try:
+    import aiohttp
+
+except ImportError:
+    aiohttp = None
+
+# the documents are retrieved only once per check, and the requests are not
+# retried
+UNSUPPORTED = ["stream", "partial", "tree_ttl", "retries", "deadline", "hedge"]
+
+
+class AsyncClient:
+    def __init__(self, concurrency=100, limit_per_host=10):
+        if aiohttp is None:
+            raise RuntimeError("Package aiohttp is required for AsyncClient")
+
+        self.concurrency = concurrency
+        self.limit_per_host = limit_per_host
+        self.semaphore = None
+        self.session = None
+
+    async def __aenter__(self):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.concurrency, limit_per_host=self.limit_per_host
+            )
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+
+
+class AsyncXML(XML):
+    def __init__(self, url, timeout=60, client=None, **kwargs):
+        super().__init__(url=url, timeout=timeout, **kwargs)
+        self.client = client
+
+    def _get(self):
+        raise RuntimeError(
+            "Document must be retrieved with AsyncXML.fetch() first"
+        )
+
+    async def _aiter_get(self):
+        # same as with requests, the timeout applies to establishing the
+        # connection and to each read separately, not to the whole transfer
+        timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=self.connect_timeout or self.timeout,
+            sock_read=self.timeout
+        )
+
+        async with self.client.semaphore:
+            start = time.perf_counter()
+            try:
+                async with self.client.session.get(
+                        self.url, timeout=timeout
+                ) as response:
+                    self.metrics["ttfb"] = time.perf_counter() - start
+                    response.raise_for_status()
+
+                    # the size is counted before the content encoding is
+                    # decoded where aiohttp keeps track of it
+                    self.metrics["size"] = 0
+                    async for chunk in response.content.iter_chunked(
+                            STREAM_CHUNK_SIZE
+                    ):
+                        self.metrics["size"] = getattr(
+                            response.content, "total_raw_bytes",
+                            self.metrics["size"] + len(chunk)
+                        )
+                        yield chunk
+
+                    self.metrics["transfer"] = \
+                        time.perf_counter() - start - self.metrics["ttfb"]
+
+            except asyncio.TimeoutError:
+                raise CriticalException(
+                    f"Connection to {self.url} timed out"
+                )
+
+            except aiohttp.ClientError as e:
+                raise CriticalException(str(e))
+
+    async def _afetch_tree(self):
+        # the document is decompressed and parsed while it is being received,
+        # so neither the whole compressed nor the whole decompressed document
+        # is kept in memory; the chunks are fed to the parser in the event
+        # loop, since the parser cannot be moved between the threads
+        parser = etree.XMLParser(**self.parser_options)
+        decompressor = Decompressor()
+        chunks = self._aiter_get()
+
+        def parse(func, *args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+
+            finally:
+                self.metrics["parse"] = self.metrics.get("parse", 0) + \
+                    time.perf_counter() - start
+
+        try:
+            async for chunk in chunks:
+                for piece in decompressor.feed(chunk):
+                    parse(parser.feed, piece)
+
+            for piece in decompressor.close():
+                parse(parser.feed, piece)
+
+            self._tree = parse(parser.close).getroottree()
+
+        except XMLSyntaxError as e:
+            self._error = CriticalException(f"Unable to parse xml: {str(e)}")
+
+        except CriticalException as e:
+            self._error = e
+
+        finally:
+            await chunks.aclose()
+
+    async def _in_executor(self, func, *args, **kwargs):
+        return await asyncio.get_event_loop().run_in_executor(
+            None, functools.partial(func, *args, **kwargs)
+        )
+
+    async def fetch(self):
+        if self._tree is None and self._error is None:
+            if get_path(self.url) is not None:
+                try:
+                    await self._in_executor(self._get_tree)
+
+                except CriticalException:
+                    pass
+
+                return self
+
+            await self._afetch_tree()
+
+        return self
+
+    async def run(self, method, **kwargs):
+        await self.fetch()
+        return await self._in_executor(getattr(self, method), **kwargs)
+
+
+async def check_target(client, target, timeout):
+    args, msg = prepare_target(target, timeout)
+
+    if msg:
+        return invalid_target(msg)
+
+    unsupported = [name for name in UNSUPPORTED if args.get(name)]
+    if unsupported:
+        return invalid_target(
+            f"Keys {', '.join(unsupported)} are not supported by the "
+            f"asynchronous client"
+        )
+
+    xml = AsyncXML(
+        url=args["url"], timeout=args["timeout"], client=client,
+        xpaths=args["xpath"], huge_tree=args["huge_tree"],
+        remove_blank_text=args["remove_blank_text"],
+        no_entities=args["no_entities"],
+        namespaces=get_namespaces(args["namespace"]),
+        connect_timeout=args["connect_timeout"], keep_files=True
+    )
+    await xml.fetch()
+
+    return await xml._in_executor(check, xml, args)
+
+
+async def run(targets, timeout, concurrency=100, limit_per_host=10):
+    async with AsyncClient(
+            concurrency=concurrency, limit_per_host=limit_per_host
+    ) as client:
+        results = await asyncio.gather(*[
+            check_target(client, target, timeout) for target in targets
+        ])
+
+    return list(zip(targets, results))
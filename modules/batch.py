@@ -0,0 +1,236 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from argo_probe_xml.arguments import Args
+from argo_probe_xml.exceptions import CriticalException
+from argo_probe_xml.nagios import Nagios
+from argo_probe_xml.probe import add_perfdata, check, validate
+from argo_probe_xml.retry import get_policy
+from argo_probe_xml.xml import XML, get_namespaces, get_session
+
+DEFAULT_SERVICE = "check_xml"
+
+_OPTIONS = ["xpath", "ok", "warning", "critical", "age", "aggregate"]
+_RETRY_OPTIONS = {
+    "connect_timeout": float, "retries": int, "deadline": float, "hedge": str
+}
+
+
+def _as_list(value):
+    if value is None:
+        return None
+
+    if isinstance(value, list):
+        return [str(item) for item in value]
+
+    return [str(value)]
+
+
+def load_targets(filename):
+    with open(filename) as f:
+        targets = json.load(f)
+
+    if not isinstance(targets, list):
+        raise ValueError(f"{filename}: List of targets expected")
+
+    for i, target in enumerate(targets):
+        if not isinstance(target, dict) or not target.get("url"):
+            raise ValueError(f"{filename}: Target {i} is missing URL")
+
+    return targets
+
+
+def target_args(target, timeout, tree_ttl=0, retry=None):
+    args = dict((name, _as_list(target.get(name))) for name in _OPTIONS)
+    args["url"] = target["url"]
+    args["timeout"] = float(target.get("timeout", timeout))
+    args["time_format"] = target.get("time_format")
+    args["namespace"] = _as_list(target.get("namespace"))
+    args["stream"] = bool(target.get("stream", False))
+    args["partial"] = bool(target.get("partial", False))
+    args["perfdata"] = bool(target.get("perfdata", False))
+    args["tree_ttl"] = float(target.get("tree_ttl", tree_ttl))
+    args["huge_tree"] = bool(target.get("huge_tree", False))
+    args["remove_blank_text"] = bool(target.get("remove_blank_text", False))
+    args["no_entities"] = bool(target.get("no_entities", False))
+
+    # retry options of the targets override the ones given for the batch
+    retry = retry or {}
+    for name, kind in _RETRY_OPTIONS.items():
+        value = target.get(name, retry.get(name))
+        args[name] = None if value is None else kind(value)
+
+    return args
+
+
+def prepare_target(target, timeout, tree_ttl=0, retry=None):
+    try:
+        args = target_args(target, timeout, tree_ttl, retry)
+        return args, validate(args)
+
+    except (TypeError, ValueError) as e:
+        return None, str(e)
+
+
+def invalid_target(msg):
+    nagios = Nagios()
+    nagios.unknown(msg)
+    return nagios
+
+
+def _check_target(target, timeout, session, cache, tree_ttl, retry):
+    args, msg = prepare_target(target, timeout, tree_ttl, retry)
+
+    if msg:
+        return invalid_target(msg)
+
+    xml = XML(
+        url=args["url"], timeout=args["timeout"], stream=args["stream"],
+        xpaths=args["xpath"], session=session, cache=cache,
+        partial=args["partial"], tree_ttl=args["tree_ttl"],
+        huge_tree=args["huge_tree"],
+        remove_blank_text=args["remove_blank_text"],
+        no_entities=args["no_entities"],
+        namespaces=get_namespaces(args["namespace"]),
+        connect_timeout=args["connect_timeout"], retry=get_policy(args),
+        keep_files=True
+    )
+
+    return check(xml, args)
+
+
+def check_target(
+        target, timeout, session=None, cache=None, tree_ttl=0, retry=None
+):
+    # errors of a single malformed target do not abort the whole batch
+    try:
+        return _check_target(target, timeout, session, cache, tree_ttl, retry)
+
+    except Exception as e:
+        return invalid_target(f"Unable to check target: {str(e)}")
+
+
+def run(
+        targets, timeout, workers=10, session=None, cache=None, tree_ttl=0,
+        retry=None
+):
+    if session is None:
+        session = get_session(pool_size=workers)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            lambda target: check_target(
+                target, timeout, session, cache, tree_ttl, retry
+            ), targets
+        )
+
+        for target, nagios in zip(targets, results):
+            yield target, nagios
+
+
+def _compare(nagios, xmls, xpath):
+    values = []
+    for xml in xmls:
+        try:
+            values.append((xml.url, xml.parse(xpath=xpath)))
+
+        except CriticalException as e:
+            nagios.critical(f"{xpath}: Unable to compare values: {str(e)}")
+            return
+
+        except Exception as e:
+            nagios.unknown(f"{xpath}: Unable to compare values: {str(e)}")
+            return
+
+    if all(value == values[0][1] for _, value in values):
+        nagios.ok(f"{xpath}: Values equal in all the documents")
+
+    else:
+        nagios.critical(
+            f"{xpath}: Values differ between the documents: " +
+            ", ".join(f"{url}: {value}" for url, value in values)
+        )
+
+
+def check_documents(
+        urls, args, workers=10, session=None, cache=None, keep_files=False
+):
+    # each of the documents is checked the same way as a single one, and the
+    # results are aggregated, together with the comparison of the values
+    # which must be the same in all the documents
+    xmls = [
+        XML(
+            url=url, timeout=args["timeout"], stream=args["stream"],
+            xpaths=(args["xpath"] or []) + (args.get("consistent") or []),
+            session=session, cache=cache, partial=args.get("partial", False),
+            tree_ttl=args.get("tree_ttl", 0),
+            huge_tree=args.get("huge_tree", False),
+            remove_blank_text=args.get("remove_blank_text", False),
+            no_entities=args.get("no_entities", False),
+            namespaces=get_namespaces(args.get("namespace")),
+            connect_timeout=args.get("connect_timeout"),
+            retry=get_policy(args), keep_files=keep_files
+        ) for url in urls
+    ]
+    document_args = dict(args, perfdata=False)
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(xmls))) as executor:
+        results = list(
+            executor.map(lambda xml: check(xml, document_args), xmls)
+        )
+
+    nagios = Nagios()
+    for xml, result in zip(xmls, results):
+        status = [nagios.ok, nagios.warning, nagios.critical, nagios.unknown]
+        status[result.get_code()](f"{xml.url}: {result.get_msg()}")
+
+    for xpath in args.get("consistent") or []:
+        _compare(nagios, xmls, xpath)
+
+    if nagios.get_code() == 0:
+        nagios.set_final_msg("All the documents pass")
+
+    else:
+        nagios.set_final_msg("Some documents do not pass")
+
+    if args.get("perfdata"):
+        argcheck = Args(args=args)
+        for i, xml in enumerate(xmls, 1):
+            add_perfdata(nagios, xml, argcheck, prefix=f"doc{i}_")
+
+    return nagios
+
+
+def _host(target):
+    # local files have no hostname in their URL
+    return target.get(
+        "host", urlparse(target["url"]).hostname or "localhost"
+    )
+
+
+def format_passive(target, nagios, timestamp=None):
+    if timestamp is None:
+        timestamp = int(time.time())
+
+    msg = nagios.get_msg().replace("\n", "\\n")
+
+    return f"[{timestamp}] PROCESS_SERVICE_CHECK_RESULT;{_host(target)};" \
+           f"{target.get('service', DEFAULT_SERVICE)};{nagios.get_code()};" \
+           f"{msg}"
+
+
+def format_json(target, nagios, timestamp=None):
+    if timestamp is None:
+        timestamp = int(time.time())
+
+    return json.dumps({
+        "timestamp": timestamp,
+        "host": _host(target),
+        "service": target.get("service", DEFAULT_SERVICE),
+        "url": target["url"],
+        "status": nagios.statuses[nagios.get_code()],
+        "code": nagios.get_code(),
+        "message": nagios.get_msg()
+    })
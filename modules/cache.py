@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+MAX_AGE = 3600
+MAX_SIZE = 100 * 1024 * 1024
+
+_BODY = ".body"
+_META = ".json"
+
+
+class CacheEntry:
+    def __init__(self, path, meta):
+        self.path = path
+        self.etag = meta.get("etag")
+        self.last_modified = meta.get("last_modified")
+        self.stored = meta.get("stored", 0)
+
+    def headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def iter_read(self, chunk_size):
+        with open(self.path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                yield chunk
+
+
+class ResponseCache:
+    def __init__(self, directory, max_age=MAX_AGE, max_size=MAX_SIZE):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(
+            self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest()
+        )
+
+    def _remove(self, path):
+        for suffix in [_META, _BODY]:
+            try:
+                os.remove(f"{path}{suffix}")
+
+            except FileNotFoundError:
+                pass
+
+    def get(self, url):
+        path = self._path(url)
+
+        try:
+            with open(f"{path}{_META}") as f:
+                meta = json.load(f)
+
+        except (IOError, ValueError):
+            return None
+
+        if meta.get("url") != url or not os.path.exists(f"{path}{_BODY}"):
+            return None
+
+        # entries are revalidated on each use, but the full document is
+        # downloaded again at least once every max_age seconds
+        if self.max_age is not None and \
+                time.time() - meta.get("stored", 0) > self.max_age:
+            self._remove(path)
+            return None
+
+        os.utime(f"{path}{_BODY}")
+
+        return CacheEntry(f"{path}{_BODY}", meta)
+
+    @staticmethod
+    def is_cacheable(headers):
+        return bool(headers.get("ETag") or headers.get("Last-Modified"))
+
+    def _write(self, path, chunks):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+
+            os.replace(tmp, path)
+
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def iter_store(self, url, headers, chunks):
+        # chunks are written to the cache as they are consumed, and the entry
+        # is stored only if the whole document has been read
+        path = self._path(url)
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "stored": time.time()
+        }
+
+        for chunk in self._write(f"{path}{_BODY}", chunks):
+            yield chunk
+
+        for _ in self._write(
+                f"{path}{_META}", [json.dumps(meta).encode("utf-8")]
+        ):
+            pass
+
+        self.evict()
+
+    def store(self, url, headers, body):
+        for _ in self.iter_store(url, headers, [body]):
+            pass
+
+    def evict(self):
+        bodies = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(_BODY):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+
+                except FileNotFoundError:
+                    continue
+
+                bodies.append((stat.st_mtime, stat.st_size, name))
+                total += stat.st_size
+
+        # least recently used entries are removed first
+        for _, size, name in sorted(bodies):
+            if total <= self.max_size:
+                break
+
+            self._remove(os.path.join(self.directory, name[:-len(_BODY)]))
+            total -= size
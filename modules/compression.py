@@ -0,0 +1,213 @@
+import bz2
+import gzip
+import io
+import itertools
+import lzma
+import zlib
+
+from argo_probe_xml.exceptions import CriticalException
+
+CHUNK_SIZE = 64 * 1024
+
+# XML document cannot start with any of the magic numbers, so compressed
+# documents (e.g. .xml.gz, .xml.bz2 or .xml.xz files) are recognized by them
+# regardless of the URL and the Content-Type; each of them is given with
+# the file object opening it, and the incremental decompressor used when the
+# chunks cannot be pulled from an iterator
+FORMATS = [
+    (
+        b"\x1f\x8b", lambda fileobj: gzip.GzipFile(fileobj=fileobj),
+        lambda: _ZlibDecompressor(16 + zlib.MAX_WBITS)
+    ),
+    (b"BZh", bz2.BZ2File, bz2.BZ2Decompressor),
+    (b"\xfd7zXZ\x00", lzma.LZMAFile, lzma.LZMADecompressor)
+]
+MAGIC_SIZE = max(len(magic) for magic, _, _ in FORMATS)
+
+DECOMPRESS_ERRORS = (EOFError, OSError, lzma.LZMAError, zlib.error)
+
+
+class ChunkReader(io.RawIOBase):
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = memoryview(b"")
+        self.failed = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = memoryview(next(self._chunks))
+
+            except StopIteration:
+                return 0
+
+            except Exception:
+                self.failed = True
+                raise
+
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+
+        return size
+
+
+class _ZlibDecompressor:
+    # zlib decompressor with the same interface as BZ2Decompressor and
+    # LZMADecompressor
+    def __init__(self, wbits):
+        self._decompressor = zlib.decompressobj(wbits)
+        self.needs_input = True
+
+    @property
+    def eof(self):
+        return self._decompressor.eof
+
+    @property
+    def unused_data(self):
+        return self._decompressor.unused_data
+
+    def decompress(self, data, max_length):
+        piece = self._decompressor.decompress(
+            self._decompressor.unconsumed_tail + data, max_length
+        )
+        self.needs_input = not self._decompressor.unconsumed_tail and \
+            len(piece) < max_length
+
+        return piece
+
+
+def get_opener(head):
+    for magic, opener, _ in FORMATS:
+        if head.startswith(magic):
+            return opener
+
+    return None
+
+
+def get_decompressor(head):
+    for magic, _, decompressor in FORMATS:
+        if head.startswith(magic):
+            return decompressor
+
+    return None
+
+
+def decompress(chunks, chunk_size=CHUNK_SIZE):
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= MAGIC_SIZE:
+            break
+
+    opener = get_opener(head)
+    if opener is None:
+        if head:
+            yield head
+
+        for chunk in chunks:
+            yield chunk
+
+        return
+
+    # the document is decompressed while it is being received, in pieces of
+    # limited size, so neither the whole compressed nor the whole
+    # decompressed document is kept in memory; concatenated streams (e.g.
+    # from pigz or pbzip2) are decompressed one after the other
+    reader = ChunkReader(itertools.chain([head], chunks))
+    stream = opener(reader)
+    try:
+        while True:
+            data = stream.read(chunk_size)
+            if not data:
+                break
+
+            yield data
+
+    except DECOMPRESS_ERRORS as e:
+        if reader.failed:
+            raise
+
+        raise CriticalException(f"Unable to decompress XML document: {str(e)}")
+
+
+class Decompressor:
+    # the counterpart of decompress() for the chunks which are pushed to it
+    # as they are received (e.g. by aiohttp), instead of being pulled from
+    # an iterator; each of the chunks is decompressed in pieces of limited
+    # size right away
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._head = b""
+        self._new = None
+        self._decompressor = None
+        self._plain = False
+
+    def feed(self, chunk):
+        if self._plain:
+            pieces = [chunk] if chunk else []
+
+        elif self._decompressor is None:
+            self._head += chunk
+            if len(self._head) < MAGIC_SIZE:
+                return
+
+            pieces = self._start()
+
+        else:
+            pieces = self._decompress(chunk)
+
+        for piece in pieces:
+            yield piece
+
+    def close(self):
+        # the documents shorter than the magic numbers are only recognized
+        # once all of them is received
+        if self._head:
+            for piece in self._start():
+                yield piece
+
+        if self._decompressor is not None and not self._decompressor.eof:
+            raise CriticalException(
+                "Unable to decompress XML document: Compressed file ended "
+                "before the end-of-stream marker was reached"
+            )
+
+    def _start(self):
+        head = self._head
+        self._head = b""
+        self._new = get_decompressor(head)
+        if self._new is None:
+            self._plain = True
+            return [head]
+
+        self._decompressor = self._new()
+        return self._decompress(head)
+
+    def _decompress(self, data):
+        # concatenated streams are decompressed one after the other
+        try:
+            while True:
+                if self._decompressor.eof:
+                    data = self._decompressor.unused_data + data
+                    if not data:
+                        return
+
+                    self._decompressor = self._new()
+
+                elif not data and self._decompressor.needs_input:
+                    return
+
+                piece = self._decompressor.decompress(data, self.chunk_size)
+                data = b""
+                if piece:
+                    yield piece
+
+        except DECOMPRESS_ERRORS as e:
+            raise CriticalException(
+                f"Unable to decompress XML document: {str(e)}"
+            )
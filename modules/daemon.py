@@ -0,0 +1,75 @@
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+            stdout, stderr, code = self.server.probe(
+                request["argv"], request.get("cwd")
+            )
+
+        except Exception as e:
+            stdout, stderr, code = f"UNKNOWN - {str(e)}\n", "", 3
+
+        self.wfile.write(
+            json.dumps(
+                {"stdout": stdout, "stderr": stderr, "code": code}
+            ).encode("utf-8") + b"\n"
+        )
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(path, probe):
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _terminate)
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    server = _Server(path, _Handler)
+    server.probe = probe
+
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def request(path, argv):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            sock.sendall(
+                # relative paths are resolved against the working directory
+                # of the client, not the one of the daemon
+                json.dumps(
+                    {"argv": argv, "cwd": os.getcwd()}
+                ).encode("utf-8") + b"\n"
+            )
+            with sock.makefile("rb") as f:
+                response = json.loads(f.readline().decode("utf-8"))
+
+        return response["stdout"], response["stderr"], response["code"]
+
+    except (OSError, ValueError, KeyError) as e:
+        return f"UNKNOWN - Unable to get result from probe daemon: " \
+               f"{str(e)}\n", "", 3
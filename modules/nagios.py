@@ -8,6 +8,7 @@ class Nagios:
         self._code = self.OK
         self._msgs = []
         self._final_msg = ""
+        self._perfdata = []
         self.statuses = ["OK", "WARNING", "CRITICAL", "UNKNOWN"]
 
     def ok(self, msg):
@@ -30,6 +31,30 @@ class Nagios:
     def set_final_msg(self, msg):
         self._final_msg = msg
 
+    @staticmethod
+    def _number(value):
+        if isinstance(value, float):
+            if value.is_integer():
+                return str(int(value))
+
+            return f"{value:.6f}".rstrip("0").rstrip(".")
+
+        return str(value)
+
+    def add_perfdata(
+            self, label, value, uom="", warning="", critical="", minimum="",
+            maximum=""
+    ):
+        label = label.replace("=", "_").replace("'", "_")
+        if " " in label:
+            label = f"'{label}'"
+
+        fields = [
+            f"{self._number(value)}{uom}", warning, critical,
+            self._number(minimum), self._number(maximum)
+        ]
+        self._perfdata.append(f"{label}={';'.join(fields).rstrip(';')}")
+
     def get_code(self):
         return self._code
 
@@ -43,6 +68,9 @@ class Nagios:
         else:
             final_msg = self.statuses[self._code]
 
+        if self._perfdata:
+            final_msg = f"{final_msg} | {' '.join(self._perfdata)}"
+
         if len(self._msgs) != 1:
             for msg in self._msgs:
                 final_msg = f"{final_msg}\n{msg}"
@@ -0,0 +1,195 @@
+from argo_probe_xml.arguments import Args
+from argo_probe_xml.exceptions import WarningException, CriticalException
+from argo_probe_xml.nagios import Nagios
+from argo_probe_xml.retry import is_valid_hedge
+from argo_probe_xml.xml import compile_xpath, get_namespaces, \
+    is_simple_xpath
+from lxml import etree
+
+
+def validate(args):
+    argcheck = Args(args=args)
+
+    if args["xpath"] and not argcheck.check_validity():
+        return "When testing for multiple XPaths, optional arguments must " \
+               "have '<node_name>:' prefix"
+
+    if args["xpath"] and not argcheck.check_mutually_exclusive():
+        return "Arguments --ok [-w | -c] --age are mutually exclusive for " \
+               "each XPath"
+
+    if args["xpath"] and not argcheck.check_thresholds():
+        return "Invalid format of warning or critical threshold"
+
+    if args["xpath"] and not argcheck.check_aggregates():
+        return "Argument --aggregate must be one of sum, avg, min, max, " \
+               "count or p<percentile>, and cannot be used with --ok or " \
+               "--age for the same XPath"
+
+    if args["age"] and args["time_format"] is None:
+        return "Argument --time-format is mandatory with --age argument"
+
+    try:
+        get_namespaces(args.get("namespace"))
+
+    except ValueError as e:
+        return str(e)
+
+    if args.get("retries") is not None and args["retries"] < 0:
+        return "Argument --retries must be a non-negative integer"
+
+    for name in ["connect_timeout", "deadline"]:
+        if args.get(name) is not None and args[name] <= 0:
+            return f"Argument --{name.replace('_', '-')} must be positive"
+
+    if args.get("hedge") is not None and not is_valid_hedge(args["hedge"]):
+        return "Argument --hedge must be given in seconds or as " \
+               "p<percentile> of the previous response times"
+
+    for xpath in args.get("consistent") or []:
+        try:
+            compile_xpath(xpath)
+
+        except etree.XPathSyntaxError as e:
+            return f"Invalid XPath {xpath} in --consistent argument: {e}"
+
+    if args.get("partial") and not args["xpath"]:
+        return "Argument --partial must be used with -x argument"
+
+    xpaths = (args["xpath"] or []) + (args.get("consistent") or [])
+    for mode in ["partial", "stream"]:
+        if args.get(mode) and \
+                not all(is_simple_xpath(xpath) for xpath in xpaths):
+            return f"Only simple absolute XPaths can be used with --{mode} " \
+                   f"argument"
+
+    return None
+
+
+def add_perfdata(nagios, xml, argcheck, prefix=""):
+    for xpath, stats in xml.stats.items():
+        name = xpath.split("/")[-1]
+        thresholds = {
+            "warning": argcheck.warning4node(name) or "",
+            "critical": argcheck.critical4node(name) or ""
+        }
+        label = f"{prefix}{name}"
+        if "aggregate" in stats:
+            label = f"{label}_{stats['aggregate']}"
+
+        if stats["count"] == 1:
+            nagios.add_perfdata(label, stats["min"], **thresholds)
+
+        else:
+            nagios.add_perfdata(f"{label}_min", stats["min"], **thresholds)
+            nagios.add_perfdata(f"{label}_max", stats["max"], **thresholds)
+
+    for phase in ["ttfb", "transfer", "parse"]:
+        if phase in xml.metrics:
+            nagios.add_perfdata(
+                f"{prefix}time_{phase}", xml.metrics[phase], uom="s",
+                minimum=0
+            )
+
+    for xpath, elapsed in xml.metrics.get("xpath", {}).items():
+        nagios.add_perfdata(
+            f"{prefix}time_xpath_{xpath.split('/')[-1]}", elapsed, uom="s",
+            minimum=0
+        )
+
+    if "size" in xml.metrics:
+        nagios.add_perfdata(
+            f"{prefix}size", xml.metrics["size"], uom="B", minimum=0
+        )
+
+
+def check(xml, args):
+    argcheck = Args(args=args)
+    nagios = Nagios()
+
+    if args["xpath"]:
+        for xpath in args["xpath"]:
+            try:
+                name = xpath.split("/")[-1]
+                ok = argcheck.ok4node(name)
+                critical = argcheck.critical4node(name)
+                warning = argcheck.warning4node(name)
+                age = argcheck.age4node(name)
+                aggregate = argcheck.aggregate4node(name)
+                if warning:
+                    xml.thresholds(
+                        xpath=xpath, warning=warning, critical=critical,
+                        aggregate=aggregate
+                    )
+
+                elif age:
+                    if xml.check_if_younger(
+                            xpath=xpath,
+                            age=float(age),
+                            time_format=args["time_format"]
+                    ):
+                        nagios.ok(
+                            f"{xpath}: Node(s) time value younger than {age}"
+                        )
+
+                elif ok:
+                    if xml.equal(xpath=xpath, value=ok):
+                        nagios.ok(
+                            f"{xpath}: All the node(s) values equal to '{ok}'"
+                        )
+
+                else:
+                    if critical or aggregate:
+                        xml.thresholds(
+                            xpath=xpath, critical=critical,
+                            aggregate=aggregate
+                        )
+
+                    node = xml.parse(xpath=xpath)
+
+                    if node:
+                        nagios.ok(f"Node with XPath '{xpath}' found")
+
+                    else:
+                        nagios.warning(
+                            f"Node with XPath '{xpath}' found but not defined"
+                        )
+
+            except CriticalException as e:
+                nagios.critical(str(e))
+                continue
+
+            except WarningException as e:
+                nagios.warning(str(e))
+                continue
+
+            except Exception as e:
+                nagios.unknown(str(e))
+                continue
+
+        if len(args["xpath"]) > 1:
+            if nagios.get_code() == 0:
+                nagios.set_final_msg("All the checks pass")
+
+            else:
+                nagios.set_final_msg("Some checks do not pass")
+
+    else:
+        try:
+            ok = xml.parse()
+            if ok:
+                nagios.ok("Response OK")
+
+            else:
+                nagios.unknown("Parsing problem")
+
+        except CriticalException as e:
+            nagios.critical(str(e))
+
+        except Exception as e:
+            nagios.unknown(str(e))
+
+    if args.get("perfdata"):
+        add_perfdata(nagios, xml, argcheck)
+
+    return nagios
@@ -0,0 +1,133 @@
+import collections
+import random
+import threading
+import time
+
+from argo_probe_xml import aggregate
+
+BACKOFF = 0.5
+MAX_BACKOFF = 8.
+
+# responses with these status codes are usually caused by transient
+# problems of the server, so the request is retried
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# times to the first byte of the last LATENCY_SAMPLES responses of each of the
+# hosts are kept for the percentile hedging delay, which is used only once
+# there are at least MIN_LATENCY_SAMPLES of them
+LATENCY_SAMPLES = 100
+MIN_LATENCY_SAMPLES = 20
+
+_latencies = dict()
+_latencies_lock = threading.Lock()
+
+
+def record_latency(host, latency):
+    with _latencies_lock:
+        _latencies.setdefault(
+            host, collections.deque(maxlen=LATENCY_SAMPLES)
+        ).append(latency)
+
+
+def latency_percentile(host, spec):
+    with _latencies_lock:
+        latencies = list(_latencies.get(host, []))
+
+    if len(latencies) < MIN_LATENCY_SAMPLES:
+        return None
+
+    return aggregate.aggregate(latencies, spec)
+
+
+def is_valid_hedge(spec):
+    if spec.startswith("p"):
+        return aggregate.is_valid(spec)
+
+    try:
+        return float(spec) >= 0
+
+    except ValueError:
+        return False
+
+
+def _close(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def hedged(request, delay):
+    # the same request is sent once more if the first one has not been
+    # answered in delay seconds, and the response received first is used;
+    # concurrent.futures is imported only when needed, since it is not used
+    # by single checks otherwise
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    executor = ThreadPoolExecutor(max_workers=2)
+
+    try:
+        futures = [executor.submit(request)]
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            futures.append(executor.submit(request))
+
+        response = None
+        error = None
+        pending = set(futures)
+        while pending and response is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+
+                elif response is None:
+                    response = future.result()
+
+                else:
+                    future.result().close()
+
+        # the slower response is closed once it is received
+        for future in pending:
+            future.add_done_callback(_close)
+
+        if response is None:
+            raise error
+
+        return response
+
+    finally:
+        executor.shutdown(wait=False)
+
+
+class RetryPolicy:
+    def __init__(self, retries=0, deadline=None, hedge=None, backoff=BACKOFF):
+        self.retries = retries
+        self.deadline = deadline
+        self.hedge = hedge
+        self.backoff = backoff
+
+    def delay(self, attempt):
+        # exponential backoff with full jitter, so that the probes retrying
+        # at the same time do not hit the server all at once
+        return random.uniform(0, min(MAX_BACKOFF, self.backoff * 2 ** attempt))
+
+    def remaining(self, start):
+        if self.deadline is None:
+            return None
+
+        return self.deadline - (time.monotonic() - start)
+
+    def hedge_delay(self, host):
+        if not self.hedge:
+            return None
+
+        if self.hedge.startswith("p"):
+            return latency_percentile(host, self.hedge)
+
+        return float(self.hedge)
+
+
+def get_policy(args):
+    return RetryPolicy(
+        retries=args.get("retries") or 0, deadline=args.get("deadline"),
+        hedge=args.get("hedge")
+    )
@@ -0,0 +1,224 @@
+import http.client
+import os
+import ssl
+import zlib
+from urllib.parse import urljoin, urlsplit
+
+MAX_REDIRECTS = 30
+REDIRECTS = (301, 302, 303, 307, 308)
+USER_AGENT = "argo-probe-xml"
+ACCEPT_ENCODING = "gzip, deflate"
+
+# CA bundles are looked up in the same environment variables as by requests
+CA_BUNDLE_ENV = ["REQUESTS_CA_BUNDLE", "CURL_CA_BUNDLE"]
+
+# no_proxy only lists the hosts reached without proxy, so it does not matter
+PROXY_ENV = ["http_proxy", "https_proxy", "all_proxy"]
+
+
+class ClientError(Exception):
+    pass
+
+
+class HTTPError(ClientError):
+    pass
+
+
+def is_supported(url):
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or parts.username:
+        return False
+
+    # proxies are not supported
+    for name in os.environ:
+        if name.lower() in PROXY_ENV and os.environ[name]:
+            return False
+
+    return True
+
+
+def get_context():
+    for name in CA_BUNDLE_ENV:
+        bundle = os.environ.get(name)
+        if bundle:
+            if os.path.isdir(bundle):
+                return ssl.create_default_context(capath=bundle)
+
+            return ssl.create_default_context(cafile=bundle)
+
+    return ssl.create_default_context()
+
+
+class Response:
+    def __init__(self, url, connection, response):
+        self.url = url
+        self.status_code = response.status
+        self.reason = response.reason
+        self.headers = response.msg
+        self._connection = connection
+        self._response = response
+        self._content = None
+        self._decoder = None
+        self._received = 0
+        if self.headers.get("Content-Encoding", "").strip().lower() in [
+            "gzip", "x-gzip", "deflate"
+        ]:
+            # both gzip and zlib headers are detected automatically
+            self._decoder = zlib.decompressobj(32 + zlib.MAX_WBITS)
+
+    def _read(self, amt=None):
+        try:
+            data = self._response.read(amt)
+            self._received += len(data)
+            return data
+
+        except (OSError, http.client.HTTPException) as e:
+            raise ClientError(f"{self.url}: {str(e) or repr(e)}")
+
+    def _decode(self, data, flush=False):
+        try:
+            if flush:
+                return self._decoder.flush()
+
+            return self._decoder.decompress(data)
+
+        except zlib.error as e:
+            raise ClientError(f"{self.url}: Unable to decode content: {e}")
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = b"".join(self.iter_content(chunk_size=64 * 1024))
+            self.close()
+
+        return self._content
+
+    def iter_content(self, chunk_size=1):
+        if self._content is not None:
+            for i in range(0, len(self._content), chunk_size):
+                yield self._content[i:i + chunk_size]
+
+            return
+
+        while True:
+            chunk = self._read(chunk_size)
+            if not chunk:
+                break
+
+            if self._decoder is not None:
+                chunk = self._decode(chunk)
+
+            if chunk:
+                yield chunk
+
+        if self._decoder is not None:
+            chunk = self._decode(b"", flush=True)
+            if chunk:
+                yield chunk
+
+    def tell(self):
+        # number of bytes received, before the content is decoded
+        return self._received
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 500:
+            kind = "Client Error"
+
+        elif 500 <= self.status_code < 600:
+            kind = "Server Error"
+
+        else:
+            return
+
+        raise HTTPError(
+            f"{self.status_code} {kind}: {self.reason} for url: {self.url}"
+        )
+
+    def close(self):
+        self._response.close()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Session:
+    # minimal replacement for requests.Session.get() used by the probe for
+    # single checks, since importing requests takes longer than the check
+    def __init__(self):
+        self._context = None
+
+    def _connection(self, parts, timeout):
+        if parts.scheme == "https":
+            if self._context is None:
+                self._context = get_context()
+
+            return http.client.HTTPSConnection(
+                parts.hostname, parts.port, timeout=timeout,
+                context=self._context
+            )
+
+        elif parts.scheme == "http":
+            return http.client.HTTPConnection(
+                parts.hostname, parts.port, timeout=timeout
+            )
+
+        else:
+            raise ClientError(f"Unsupported URL scheme '{parts.scheme}'")
+
+    def _request(self, url, timeout, headers):
+        # timeout is either a single value or separate connect and read
+        # timeouts, the same as with requests
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+
+        else:
+            connect_timeout = read_timeout = timeout
+
+        parts = urlsplit(url)
+        connection = self._connection(parts, connect_timeout)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        request_headers = {
+            "User-Agent": USER_AGENT, "Accept": "*/*",
+            "Accept-Encoding": ACCEPT_ENCODING
+        }
+        if headers:
+            request_headers.update(headers)
+
+        try:
+            if read_timeout != connect_timeout:
+                connection.connect()
+                connection.sock.settimeout(read_timeout)
+
+            connection.request("GET", path, headers=request_headers)
+            return Response(url, connection, connection.getresponse())
+
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            raise ClientError(
+                f"{parts.scheme}://{parts.netloc}: {str(e) or repr(e)}"
+            )
+
+    def get(self, url, timeout=None, stream=False, headers=None):
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._request(url, timeout, headers)
+            location = response.headers.get("Location")
+            if response.status_code not in REDIRECTS or not location:
+                break
+
+            response.close()
+            url = urljoin(url, location)
+
+        else:
+            raise ClientError(f"Exceeded {MAX_REDIRECTS} redirects")
+
+        if not stream:
+            response.content
+
+        return response
@@ -0,0 +1,131 @@
+import functools
+import math
+
+NUMPY_MIN_SIZE = 1000
+
+
+class Threshold:
+    def __init__(self, spec):
+        self.spec = spec
+        self.negate = False
+        self.location = "outside"
+
+        threshold = spec
+        if threshold.startswith("@"):
+            self.negate = True
+            self.location = "inside"
+            threshold = threshold.strip("@")
+
+        if ":" not in threshold:
+            self.lower = 0
+            self.upper = float(threshold)
+            self.rng = f"[0, {self.upper}]"
+
+        else:
+            if threshold.startswith(":"):
+                self.lower = -math.inf
+                self.upper = float(threshold.strip(":"))
+                self.rng = f"[-Inf, {self.upper}]"
+
+            elif threshold.endswith(":"):
+                self.lower = float(threshold.strip(":"))
+                self.upper = math.inf
+                self.rng = f"[{self.lower}, Inf]"
+
+            else:
+                limits = threshold.split(":")
+                self.lower = float(limits[0].strip())
+                self.upper = float(limits[1].strip())
+                self.rng = f"[{self.lower}, {self.upper}]"
+
+    def __repr__(self):
+        return f"Threshold('{self.spec}')"
+
+    def fails(self, value):
+        return (self.lower <= float(value) <= self.upper) == self.negate
+
+    def failing(self, values):
+        failing, _ = classify(values, critical=self)
+
+        return failing["critical"]
+
+
+@functools.lru_cache(maxsize=256)
+def get_threshold(spec):
+    return Threshold(spec)
+
+
+def is_valid(spec):
+    try:
+        get_threshold(spec)
+        return True
+
+    except ValueError:
+        return False
+
+
+def classify(values, critical=None, warning=None):
+    # each value is converted to number once and classified in a single pass
+    # as CRITICAL if it fails the critical threshold, WARNING if it fails only
+    # the warning threshold, and OK otherwise; returns indices of the values
+    # failing each of the thresholds together with the summary statistics
+    numpy = None
+    if len(values) >= NUMPY_MIN_SIZE:
+        try:
+            import numpy
+
+        except ImportError:
+            pass
+
+    thresholds = [
+        (analysis, threshold) for analysis, threshold in [
+            ("critical", critical), ("warning", warning)
+        ] if threshold
+    ]
+
+    if numpy is not None:
+        # values are converted with float(), and NaN values are left out of
+        # the minimum and the maximum, the same way as without numpy
+        array = numpy.fromiter(map(float, values), float, len(values))
+        failing = {}
+        remaining = numpy.ones(len(array), dtype=bool)
+        for analysis, threshold in thresholds:
+            inside = (array >= threshold.lower) & (array <= threshold.upper)
+            mask = (inside if threshold.negate else ~inside) & remaining
+            failing[analysis] = numpy.flatnonzero(mask).tolist()
+            remaining &= ~mask
+
+        numbers = array[~numpy.isnan(array)]
+        stats = {
+            "count": len(array),
+            "min": float(numbers.min()) if numbers.size else math.inf,
+            "max": float(numbers.max()) if numbers.size else -math.inf
+        }
+
+    else:
+        checks = [
+            (threshold.lower, threshold.upper, threshold.negate, [])
+            for _, threshold in thresholds
+        ]
+        minimum = math.inf
+        maximum = -math.inf
+        for i, item in enumerate(values):
+            value = float(item)
+            if value < minimum:
+                minimum = value
+
+            if value > maximum:
+                maximum = value
+
+            for lower, upper, negate, indices in checks:
+                if (lower <= value <= upper) == negate:
+                    indices.append(i)
+                    break
+
+        failing = dict(
+            (analysis, check[3])
+            for (analysis, _), check in zip(thresholds, checks)
+        )
+        stats = {"count": len(values), "min": minimum, "max": maximum}
+
+    return failing, stats
@@ -0,0 +1,70 @@
+import datetime
+import functools
+import re
+
+UNIX = "UNIX"
+ISO = "ISO"
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+_DATE = r"\d{4}-\d{2}-\d{2}"
+_TIME = r"\d{2}:\d{2}:\d{2}"
+
+# strptime formats which are subsets of ISO 8601, and the regular expressions
+# of values for which fromisoformat gives the same result as strptime
+_ISO_FORMATS = {
+    "%Y-%m-%d": re.compile(_DATE),
+    "%Y-%m-%dT%H:%M:%S": re.compile(f"{_DATE}T{_TIME}"),
+    "%Y-%m-%d %H:%M:%S": re.compile(f"{_DATE} {_TIME}")
+}
+
+
+def _from_iso(item):
+    if item.endswith("Z"):
+        item = f"{item[:-1]}+00:00"
+
+    dt = datetime.datetime.fromisoformat(item)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+    return dt
+
+
+@functools.lru_cache(maxsize=32)
+def get_parser(time_format):
+    def strptime(item):
+        return datetime.datetime.strptime(item, time_format)
+
+    if not hasattr(datetime.datetime, "fromisoformat"):
+        return strptime
+
+    if time_format == ISO:
+        return _from_iso
+
+    pattern = _ISO_FORMATS.get(time_format)
+    if pattern is None:
+        return strptime
+
+    def from_iso_format(item):
+        if pattern.fullmatch(item):
+            return datetime.datetime.fromisoformat(item)
+
+        return strptime(item)
+
+    return from_iso_format
+
+
+def ages(values, time_format, now):
+    # ages in hours of the given times relative to now; the days component of
+    # the difference is ignored, the same as with timedelta.seconds
+    if time_format == UNIX:
+        now_us = (now - EPOCH) // datetime.timedelta(microseconds=1)
+
+        return [
+            ((now_us - timestamp * 1000000) // 1000000 % 86400) / 3600.
+            for timestamp in [int(item) for item in values]
+        ]
+
+    parse = get_parser(time_format)
+
+    return [(now - parse(item)).seconds / 3600. for item in values]
@@ -0,0 +1,116 @@
+import collections
+import threading
+import time
+
+MAX_SIZE = 256 * 1024 * 1024
+
+# each node of the parsed document (element, text, comment...) takes about as
+# much memory as libxml2 xmlNode structure, besides the text itself
+NODE_SIZE = 120
+
+
+def estimate_size(tree, size):
+    return size + NODE_SIZE * int(tree.xpath("count(//node())"))
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.tree = None
+        self.error = None
+
+
+class TreeCache:
+    # parsed documents are shared by the checks of the same document; trees
+    # are only read by the checks, so they can be used from multiple threads
+    def __init__(self, max_size=MAX_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._flights = dict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key, max_age, version):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        loaded, entry_version, _, tree = entry
+        if entry_version != version or (
+                max_age is not None and time.monotonic() - loaded > max_age
+        ):
+            return None
+
+        self._entries.move_to_end(key)
+        return tree
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def _store(self, key, version, tree, size):
+        with self._lock:
+            self._remove(key)
+            if size > self.max_size:
+                return
+
+            self._entries[key] = (time.monotonic(), version, size, tree)
+            self.size += size
+            while self.size > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def get(self, key, load, max_age=None, version=None, flight_key=None):
+        # load() returns the parsed tree and the size of the document; if
+        # the same document is already being loaded by another thread with
+        # the same flight_key (the options of the request), its tree (or
+        # error) is used instead of loading the document again
+        flight_id = (key, version, flight_key)
+        with self._lock:
+            tree = self._lookup(key, max_age, version)
+            if tree is not None:
+                return tree
+
+            flight = self._flights.get(flight_id)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[flight_id] = flight
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+
+            return flight.tree
+
+        try:
+            flight.tree, size = load()
+
+            # trees which are not reused later are not kept, and their size
+            # is not estimated
+            if max_age is None or max_age > 0:
+                self._store(
+                    key, version, flight.tree,
+                    estimate_size(flight.tree, size)
+                )
+
+            return flight.tree
+
+        except Exception as e:
+            flight.error = e
+            raise
+
+        finally:
+            with self._lock:
+                del self._flights[flight_id]
+
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
@@ -1,63 +1,764 @@
+import collections
 import datetime
+import functools
 import io
-import math
-
-import requests
+import mmap
+import os
+import re
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+
+from argo_probe_xml import simplehttp
+from argo_probe_xml.aggregate import aggregate as aggregate_values
+from argo_probe_xml.compression import MAGIC_SIZE, decompress, get_opener
 from argo_probe_xml.exceptions import WarningException, CriticalException
+from argo_probe_xml.retry import RETRY_STATUS, RetryPolicy, hedged, \
+    record_latency
+from argo_probe_xml.threshold import classify, get_threshold
+from argo_probe_xml.timestamp import ages
+from argo_probe_xml.treecache import TreeCache
 from lxml import etree
 from lxml.etree import XMLSyntaxError
 
+XPATH_CACHE_SIZE = 256
+STREAM_CHUNK_SIZE = 64 * 1024
+POOL_SIZE = 10
+MAX_RETRIES = 0
+
+SIMPLE_XPATH = re.compile(r"^(/([A-Za-z_][\w.\-]*:)?[A-Za-z_][\w.\-]*)+$")
+NAMESPACE = re.compile(r"^([A-Za-z_][\w.\-]*)=(.+)$")
+
+_xpath_cache = collections.OrderedDict()
+_xpath_cache_lock = threading.Lock()
+
+_tree_cache = TreeCache()
+
+# external DTDs and entities (e.g. local files) are never loaded, and
+# nothing is fetched from the network by the parser; lxml before 5.0 cannot
+# expand only the entities declared in the document, so none are expanded
+PARSER_OPTIONS = {
+    "load_dtd": False, "no_network": True,
+    "resolve_entities": "internal" if etree.LXML_VERSION >= (5,) else False
+}
+
+_parsers = threading.local()
+
 
 def get_date_now():
     return datetime.datetime.utcnow()
 
 
+def compile_xpath(xpath, namespaces=None):
+    key = (xpath, tuple(sorted(namespaces.items())) if namespaces else None)
+
+    with _xpath_cache_lock:
+        evaluator = _xpath_cache.get(key)
+        if evaluator is not None:
+            _xpath_cache.move_to_end(key)
+            return evaluator
+
+    evaluator = etree.XPath(xpath, namespaces=namespaces)
+
+    with _xpath_cache_lock:
+        _xpath_cache[key] = evaluator
+        while len(_xpath_cache) > XPATH_CACHE_SIZE:
+            _xpath_cache.popitem(last=False)
+
+    return evaluator
+
+
+def parser_options(
+        huge_tree=False, remove_blank_text=False, no_entities=False
+):
+    options = dict(
+        PARSER_OPTIONS, huge_tree=huge_tree,
+        remove_blank_text=remove_blank_text
+    )
+
+    # huge_tree also lifts libxml2 limits on the expansion of entities, so
+    # broken or hostile documents could make the parser expand them without
+    # bounds; entities are then not expanded at all
+    if huge_tree or no_entities:
+        options["resolve_entities"] = False
+
+    return options
+
+
+def options_key(options):
+    return tuple(sorted(options.items()))
+
+
+def get_parser(options):
+    # parsers cannot be used by multiple threads at the same time, so each
+    # thread keeps its own parser for each of the configurations
+    parsers = getattr(_parsers, "parsers", None)
+    if parsers is None:
+        parsers = _parsers.parsers = dict()
+
+    key = options_key(options)
+    parser = parsers.get(key)
+    if parser is None:
+        parser = parsers[key] = etree.XMLParser(**options)
+
+    return parser
+
+
+def get_session(pool_size=POOL_SIZE, max_retries=MAX_RETRIES):
+    # requests is imported only when needed, since importing it takes longer
+    # than the rest of a single check
+    import requests
+
+    # connections are kept alive in the adapter's pool, so repeated requests
+    # to the same host made through the session skip TCP and TLS handshakes
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size,
+        max_retries=max_retries
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def request_errors(session):
+    if isinstance(session, simplehttp.Session):
+        return simplehttp.ClientError
+
+    import requests
+
+    return requests.exceptions.RequestException
+
+
+def received_size(response):
+    # returns a function giving the number of bytes of the response received
+    # so far, before the content encoding (e.g. gzip) is decoded
+    if isinstance(response, simplehttp.Response):
+        return response.tell
+
+    raw = getattr(response, "raw", None)
+    return getattr(raw, "tell", None)
+
+
+def cached_size():
+    # no body is received with 304 response, the document is read from the
+    # cache
+    return 0
+
+
+def get_path(url):
+    parts = urlsplit(url)
+    if parts.scheme == "file":
+        return unquote(parts.path)
+
+    elif parts.scheme == "":
+        return url
+
+    return None
+
+
+def _parse_file(f, size, options):
+    if size == 0:
+        return etree.parse(io.BytesIO(b""), get_parser(options)), 0
+
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if get_opener(data[:MAGIC_SIZE]) is None:
+            # the mapped file is parsed in place, without reading it into
+            # a bytes object first
+            return etree.fromstring(
+                data, get_parser(options)
+            ).getroottree(), size
+
+        # the shared parser is not used for feeding, since it could be left
+        # in the middle of the document if the decompression fails
+        parser = etree.XMLParser(**options)
+        chunks = (
+            data[i:i + STREAM_CHUNK_SIZE]
+            for i in range(0, size, STREAM_CHUNK_SIZE)
+        )
+        size = 0
+        for chunk in decompress(chunks):
+            size += len(chunk)
+            parser.feed(chunk)
+
+        return parser.close().getroottree(), size
+
+
+def get_file_tree(path, options=None, keep=True):
+    if options is None:
+        options = parser_options()
+
+    # parsed trees are reused while the file is not modified, so the files
+    # are parsed only once per modification in the daemon and batch mode;
+    # trees which cannot be reused are not kept, and their size is not
+    # estimated
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+
+        return _tree_cache.get(
+            ("file", path, options_key(options)),
+            lambda: _parse_file(f, stat.st_size, options),
+            max_age=None if keep else 0,
+            version=(stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        )
+
+
+def format_number(value):
+    # numbers are formatted the same way as by XPath string() function, but
+    # without the floating point rounding errors
+    value = round(value, 10)
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+
+    return str(value)
+
+
+def xpath_values(result):
+    # XPath expressions evaluate to node-sets, or to numbers, strings or
+    # booleans (e.g. sum() or count() functions, or comparisons)
+    if isinstance(result, bool):
+        return ["true" if result else "false"]
+
+    elif isinstance(result, float):
+        return [format_number(result)]
+
+    elif isinstance(result, str):
+        return [str(result)]
+
+    # text and attribute nodes are returned as strings
+    return [
+        str(item) if isinstance(item, str) else item.text
+        for item in result
+    ]
+
+
+def is_simple_xpath(xpath):
+    return bool(SIMPLE_XPATH.match(xpath))
+
+
+def get_namespaces(items):
+    namespaces = dict()
+    for item in items or []:
+        match = NAMESPACE.match(item)
+        if not match:
+            raise ValueError(
+                f"Invalid namespace {item}: must be given as prefix=uri"
+            )
+
+        namespaces[match.group(1)] = match.group(2)
+
+    return namespaces
+
+
+def merge_namespaces(nsmap, namespaces=None):
+    # the namespaces declared on the root element can be used with their own
+    # prefixes, unless the same prefix is given explicitly; the default
+    # namespace has no prefix, so it has to be given explicitly
+    merged = dict((prefix, uri) for prefix, uri in nsmap.items() if prefix)
+    merged.update(namespaces or {})
+
+    return merged
+
+
+def expand_steps(xpath, namespaces):
+    # location steps of simple XPath are converted to the element tags in
+    # {uri}name notation used by lxml
+    steps = []
+    for step in xpath.strip("/").split("/"):
+        prefix, _, name = step.rpartition(":")
+        if prefix:
+            if prefix not in namespaces:
+                raise ValueError(
+                    f"Undefined namespace prefix {prefix} in XPath {xpath}"
+                )
+
+            step = f"{{{namespaces[prefix]}}}{name}"
+
+        steps.append(step)
+
+    return steps
+
+
 class XML:
-    def __init__(self, url, timeout=60):
+    def __init__(
+            self, url, timeout=60, stream=False, xpaths=None, session=None,
+            cache=None, partial=False, tree_ttl=0, huge_tree=False,
+            remove_blank_text=False, namespaces=None, connect_timeout=None,
+            retry=None, keep_files=False, no_entities=False
+    ):
         self.url = url
         self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retry = retry or RetryPolicy()
+        self.session = session
+        self.cache = cache
+        self.stream = stream or partial
+        self.partial = partial
+        self.tree_ttl = tree_ttl
+        self.keep_files = keep_files or tree_ttl > 0
+        self.parser_options = parser_options(
+            huge_tree=huge_tree, remove_blank_text=remove_blank_text,
+            no_entities=no_entities
+        )
+        self.xpaths = list(xpaths) if xpaths else []
+        self.namespaces = dict(namespaces) if namespaces else {}
+        self._namespaces = None
+        self._tree = None
+        self._values = None
+        self._index = None
+        self._error = None
+        self.stats = {}
+        self.metrics = {}
+
+    def _get_session(self):
+        if self.session is None:
+            self.session = get_session()
+
+        return self.session
+
+    def _cache_entry(self):
+        if self.cache is None:
+            return None
+
+        return self.cache.get(self.url)
 
     def _get(self):
+        start = time.perf_counter()
+        data = b"".join(self._iter_get())
+        self.metrics["transfer"] = \
+            time.perf_counter() - start - self.metrics.get("ttfb", 0.)
+
+        return data
+
+    def _received(self, chunks, start, tell=None):
+        self.metrics["size"] = 0
+        for chunk in chunks:
+            remaining = self.retry.remaining(start)
+            if remaining is not None and remaining < 0:
+                raise CriticalException(
+                    f"{self.url}: Deadline of {self.retry.deadline} s exceeded"
+                )
+
+            if tell is None:
+                self.metrics["size"] += len(chunk)
+
+            else:
+                self.metrics["size"] = tell()
+
+            yield chunk
+
+    def _iter_file(self, path):
         try:
-            response = requests.get(self.url, timeout=self.timeout)
-            response.raise_for_status()
-
-        except (
-            requests.exceptions.HTTPError,
-            requests.exceptions.ConnectionError,
-            requests.exceptions.RequestException,
-            requests.exceptions.Timeout,
-            requests.exceptions.TooManyRedirects
-        ) as e:
+            with open(path, "rb") as f:
+                self.metrics["size"] = os.fstat(f.fileno()).st_size
+                chunks = iter(
+                    functools.partial(f.read, STREAM_CHUNK_SIZE), b""
+                )
+                for chunk in decompress(chunks):
+                    yield chunk
+
+        except OSError as e:
             raise CriticalException(str(e))
 
-        else:
-            return response.content
+    def _iter_get(self):
+        path = get_path(self.url)
+        if path is not None:
+            for chunk in self._iter_file(path):
+                yield chunk
 
-    def parse(self, xpath=None):
-        try:
-            tree = etree.parse(io.BytesIO(self._get()))
+            return
 
-            if xpath:
-                elements = tree.xpath(xpath)
+        entry = self._cache_entry()
+        start = time.monotonic()
 
-                if len(elements) == 0:
-                    raise CriticalException(
-                        f"Unable to find element with XPath {xpath}"
+        try:
+            with self._request(
+                    entry.headers() if entry else None, start
+            ) as response:
+                tell = None
+                if entry is not None and response.status_code == 304:
+                    tell = cached_size
+                    chunks = entry.iter_read(STREAM_CHUNK_SIZE)
+
+                else:
+                    tell = received_size(response)
+                    response.raise_for_status()
+                    chunks = response.iter_content(
+                        chunk_size=STREAM_CHUNK_SIZE
                     )
 
-                elif len(elements) == 1:
-                    return elements[0].text
+                    if self.cache is not None and \
+                            self.cache.is_cacheable(response.headers):
+                        chunks = self.cache.iter_store(
+                            self.url, response.headers, chunks
+                        )
+
+                # the number of bytes received is counted before the
+                # compressed documents are decompressed
+                for chunk in decompress(
+                        self._received(chunks, start, tell)
+                ):
+                    yield chunk
+
+        except request_errors(self.session) as e:
+            raise CriticalException(str(e))
+
+    def _timeout(self, remaining):
+        if self.connect_timeout is None and remaining is None:
+            return self.timeout
+
+        connect = self.connect_timeout or self.timeout
+        read = self.timeout
+        if remaining is not None:
+            connect = min(connect, remaining)
+            read = min(read, remaining)
+
+        return connect, read
+
+    def _request_key(self):
+        # checks of the same document with different timeouts or retry
+        # policies must not share the outcome of each other's request
+        return (
+            self.timeout, self.connect_timeout, self.retry.retries,
+            self.retry.deadline, self.retry.hedge
+        )
+
+    def _request(self, headers, start):
+        # failed requests are retried only until the response is received,
+        # since the document may already be partially parsed afterwards
+        host = urlsplit(self.url).netloc
+        session = self._get_session()
+        first = time.perf_counter()
+        attempt = 0
+        while True:
+            remaining = self.retry.remaining(start)
+            if remaining is not None and remaining <= 0:
+                raise CriticalException(
+                    f"{self.url}: Deadline of {self.retry.deadline} s exceeded"
+                )
+
+            request = functools.partial(
+                session.get, self.url, timeout=self._timeout(remaining),
+                stream=True, headers=headers
+            )
+            delay = self.retry.hedge_delay(host)
+            attempt_start = time.perf_counter()
+            try:
+                if delay is None:
+                    response = request()
 
                 else:
-                    return [item.text for item in elements]
+                    response = hedged(request, delay)
+
+            except request_errors(session) as e:
+                response = None
+                error = e
 
             else:
-                return True
+                now = time.perf_counter()
+                record_latency(host, now - attempt_start)
+                self.metrics["ttfb"] = now - first
+                if response.status_code not in RETRY_STATUS:
+                    return response
+
+            backoff = self.retry.delay(attempt)
+            remaining = self.retry.remaining(start)
+            if attempt >= self.retry.retries or (
+                    remaining is not None and backoff >= remaining
+            ):
+                if response is None:
+                    raise error
+
+                return response
+
+            if response is not None:
+                response.close()
+
+            time.sleep(backoff)
+            attempt += 1
+
+    @staticmethod
+    def _collect(parser, paths, values, resolve=None):
+        for _, element in parser.read_events():
+            if resolve is not None and not paths:
+                # namespace prefixes are resolved with the namespaces of the
+                # root element, the same way as in the parsed tree
+                paths.update(resolve(element.getroottree().getroot().nsmap))
+
+            path = tuple(
+                [element.tag] + [item.tag for item in element.iterancestors()]
+            )
+            if path in paths:
+                values[paths[path]].append(element.text)
+
+            # processed subtrees are dropped, so that only the ancestors of
+            # the element currently being parsed are kept in memory
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+    def _stream_values(self, xpaths):
+        for xpath in xpaths:
+            if not is_simple_xpath(xpath):
+                raise ValueError(
+                    f"XPath {xpath} cannot be evaluated in streaming mode"
+                )
+
+        def resolve(nsmap):
+            namespaces = merge_namespaces(nsmap, self.namespaces)
+            return dict(
+                (tuple(reversed(expand_steps(xpath, namespaces))), xpath)
+                for xpath in xpaths
+            )
+
+        if any(":" in xpath for xpath in xpaths):
+            paths = dict()
+
+        else:
+            paths = resolve({})
+            resolve = None
+
+        values = dict((xpath, []) for xpath in xpaths)
+        parser = etree.XMLPullParser(
+            events=("end",), **self.parser_options
+        )
+        parse = 0.
+        start = time.perf_counter()
+        chunks = self._iter_get()
+
+        try:
+            for chunk in chunks:
+                parse_start = time.perf_counter()
+                parser.feed(chunk)
+                self._collect(parser, paths, values, resolve)
+                parse += time.perf_counter() - parse_start
+
+                # the rest of the document is not needed once a node has been
+                # found for each of the XPaths
+                if self.partial and all(values.values()):
+                    break
+
+            else:
+                parse_start = time.perf_counter()
+                parser.close()
+                self._collect(parser, paths, values, resolve)
+                parse += time.perf_counter() - parse_start
+
+        except XMLSyntaxError as e:
+            raise CriticalException(f"Unable to parse xml: {str(e)}")
+
+        finally:
+            # closing the response before the whole body has been read also
+            # closes the connection, so the download is stopped
+            chunks.close()
+
+        if self.partial:
+            values = dict((xpath, items[:1]) for xpath, items in values.items())
+
+        # the document is downloaded and parsed chunk by chunk, so the time
+        # not spent parsing nor waiting for the first byte is the transfer
+        self.metrics["parse"] = parse
+        self.metrics["transfer"] = time.perf_counter() - start - parse - \
+            self.metrics.get("ttfb", 0.)
+
+        return values
+
+    def _get_values(self, xpath=None):
+        xpaths = list(self.xpaths)
+        if xpath and xpath not in xpaths:
+            xpaths.append(xpath)
+
+        if self._error is None and (
+                self._values is None or
+                (xpath and xpath not in self._values)
+        ):
+            try:
+                self._values = self._stream_values(xpaths)
+
+            except CriticalException as e:
+                self._error = e
+
+        if self._error is not None:
+            raise self._error
+
+        return self._values
+
+    def _parse_data(self, data):
+        start = time.perf_counter()
+
+        try:
+            return etree.parse(
+                io.BytesIO(data), get_parser(self.parser_options)
+            )
 
         except XMLSyntaxError as e:
             raise CriticalException(f"Unable to parse xml: {str(e)}")
 
+        finally:
+            self.metrics["parse"] = time.perf_counter() - start
+
+    def _build_tree(self, data):
+        try:
+            self._tree = self._parse_data(data)
+
+        except CriticalException as e:
+            self._error = e
+
+    def _fetch_tree(self):
+        data = self._get()
+        return self._parse_data(data), len(data)
+
+    def _load_file(self, path):
+        start = time.perf_counter()
+
+        try:
+            self.metrics["size"] = os.path.getsize(path)
+            self._tree = get_file_tree(
+                path, self.parser_options, keep=self.keep_files
+            )
+
+        except OSError as e:
+            raise CriticalException(str(e))
+
+        except XMLSyntaxError as e:
+            self._error = CriticalException(f"Unable to parse xml: {str(e)}")
+
+        self.metrics["parse"] = time.perf_counter() - start
+
+    def _get_tree(self):
+        # the document is fetched and parsed only once per instance, so all
+        # the checks in a single probe run are served from the same snapshot
+        if self._tree is None and self._error is None:
+            path = get_path(self.url)
+
+            try:
+                if path is None:
+                    # the checks of the same URL running at the same time
+                    # share a single download, and the tree is reused by the
+                    # following ones for tree_ttl seconds
+                    self._tree = _tree_cache.get(
+                        ("url", self.url, options_key(self.parser_options)),
+                        self._fetch_tree,
+                        max_age=self.tree_ttl,
+                        flight_key=self._request_key()
+                    )
+
+                else:
+                    self._load_file(path)
+
+            except CriticalException as e:
+                self._error = e
+
+        if self._error is not None:
+            raise self._error
+
+        return self._tree
+
+    def reset(self):
+        self._tree = None
+        self._values = None
+        self._index = None
+        self._namespaces = None
+        self._error = None
+        self.stats = {}
+        self.metrics = {}
+
+    def _get_namespaces(self, tree):
+        if self._namespaces is None:
+            self._namespaces = merge_namespaces(
+                tree.getroot().nsmap, self.namespaces
+            )
+
+        return self._namespaces
+
+    @staticmethod
+    def _walk(element, steps, values):
+        for child in element:
+            node = steps.get(child.tag)
+            if node is not None:
+                if None in node:
+                    values[node[None]].append(child.text)
+
+                XML._walk(child, node, values)
+
+    def _build_index(self, tree):
+        # simple XPaths are merged into a tree of location steps, so that the
+        # values of all of them are collected in a single walk of the document
+        xpaths = [xpath for xpath in self.xpaths if is_simple_xpath(xpath)]
+        if len(xpaths) < 2:
+            return dict()
+
+        steps = dict()
+        values = dict()
+        namespaces = self._get_namespaces(tree)
+        for xpath in xpaths:
+            try:
+                expanded = expand_steps(xpath, namespaces)
+
+            except ValueError:
+                # the undefined prefix is reported by the XPath evaluation
+                continue
+
+            node = steps
+            for step in expanded:
+                node = node.setdefault(step, dict())
+
+            node[None] = xpath
+            values[xpath] = []
+
+        self._walk([tree.getroot()], steps, values)
+
+        return values
+
+    def _evaluate(self, tree, xpath):
+        if self._index is None:
+            self._index = self._build_index(tree)
+
+        if xpath in self._index:
+            return list(self._index[xpath])
+
+        evaluator = compile_xpath(
+            xpath, namespaces=self._get_namespaces(tree) or None
+        )
+
+        return xpath_values(evaluator(tree))
+
+    def parse(self, xpath=None):
+        if self.stream:
+            values = self._get_values(xpath=xpath)
+
+        else:
+            tree = self._get_tree()
+
+        if xpath:
+            start = time.perf_counter()
+            if self.stream:
+                nodes = values[xpath]
+
+            else:
+                nodes = self._evaluate(tree, xpath)
+
+            timings = self.metrics.setdefault("xpath", {})
+            timings[xpath] = \
+                timings.get(xpath, 0.) + time.perf_counter() - start
+
+            if len(nodes) == 0:
+                raise CriticalException(
+                    f"Unable to find element with XPath {xpath}"
+                )
+
+            elif len(nodes) == 1:
+                return nodes[0]
+
+            else:
+                return nodes
+
+        else:
+            return True
+
     def equal(self, xpath, value):
         node = self.parse(xpath=xpath)
 
@@ -89,106 +790,86 @@ class XML:
                     f"{xpath}: Node value not equal to '{value}'"
                 )
 
-    def _validate_thresholds(self, xpath, threshold, warning=False):
-        negate = False
-        location = "outside"
-        analysis = "critical"
-
-        if warning:
-            analysis = "warning"
-
-        try:
-            if threshold.startswith("@"):
-                negate = True
-                location = "inside"
-                threshold = threshold.strip("@")
-
-            if ":" not in threshold:
-                lower = 0
-                upper = float(threshold)
-                rng = f"[0, {upper}]"
+    @staticmethod
+    def _range_msg(xpath, node, failing, threshold):
+        if isinstance(node, list):
+            indices = [str(i) for i in failing]
+            path_elements = [
+                step.split(":")[-1] for step in xpath.split("/")
+            ]
+            if len(indices) > 1:
+                parent = f"{path_elements[-2].capitalize()}s"
+                value = "values"
 
             else:
-                if threshold.startswith(":"):
-                    lower = -math.inf
-                    upper = float(threshold.strip(":"))
-                    rng = f"[-Inf, {upper}]"
+                parent = f"{path_elements[-2].capitalize()}"
+                value = "value"
 
-                elif threshold.endswith(":"):
-                    lower = float(threshold.strip(":"))
-                    upper = math.inf
-                    rng = f"[{lower}, Inf]"
+            return f"{xpath}: {parent} {', '.join(indices)} {value} " \
+                   f"{threshold.location} range {threshold.rng}"
 
-                else:
-                    limits = threshold.split(":")
-                    lower = float(limits[0].strip())
-                    upper = float(limits[1].strip())
-                    rng = f"[{lower}, {upper}]"
+        else:
+            return f"{xpath}: Value {threshold.location} range " \
+                   f"{threshold.rng}"
 
-        except ValueError:
-            raise CriticalException(
-                f"{xpath}: Invalid format of {analysis} threshold"
-            )
+    def thresholds(self, xpath, warning=None, critical=None, aggregate=None):
+        thresholds = dict()
+        for analysis, spec in [("critical", critical), ("warning", warning)]:
+            if spec:
+                try:
+                    thresholds[analysis] = get_threshold(spec)
+
+                except ValueError:
+                    raise CriticalException(
+                        f"{xpath}: Invalid format of {analysis} threshold"
+                    )
 
         node = self.parse(xpath=xpath)
+        values = node if isinstance(node, list) else [node]
 
         try:
-            if isinstance(node, list):
-                if negate:
-                    validation = [
-                        not lower <= float(item) <= upper for item in node
-                    ]
+            if aggregate:
+                # the thresholds are applied to the aggregated value of all
+                # the nodes instead of each of them
+                values = [aggregate_values(values, aggregate)]
 
-                else:
-                    validation = [
-                        lower <= float(item) <= upper for item in node
-                    ]
-
-                if False in validation:
-                    indices = [
-                        str(i) for i, x in enumerate(validation) if not x
-                    ]
-                    path_elements = xpath.split("/")
-                    if len(indices) > 1:
-                        parent = f"{path_elements[-2].capitalize()}s"
-                        value = "values"
-
-                    else:
-                        parent = f"{path_elements[-2].capitalize()}"
-                        value = "value"
-
-                    exception_msg = \
-                        f"{xpath}: {parent} {', '.join(indices)} {value} " \
-                        f"{location} range {rng}"
-                    if warning:
-                        raise WarningException(exception_msg)
-
-                    else:
-                        raise CriticalException(exception_msg)
+            failing, stats = classify(values, **thresholds)
 
-                else:
-                    return "OK"
+        except ValueError:
+            raise CriticalException(f"{xpath}: Node values are not numbers")
 
-            else:
-                if negate:
-                    validation = not lower <= float(node) <= upper
+        self.stats.setdefault(xpath, {}).update(stats)
+        if aggregate:
+            self.stats[xpath]["aggregate"] = aggregate
 
-                else:
-                    validation = lower <= float(node) <= upper
+        for analysis, indices in failing.items():
+            self.stats[xpath][analysis] = len(indices)
 
-                if validation:
-                    return "OK"
+        for analysis, exception in [
+            ("critical", CriticalException), ("warning", WarningException)
+        ]:
+            if failing.get(analysis):
+                if aggregate:
+                    msg = f"{xpath}: {aggregate.capitalize()} value " \
+                          f"{format_number(values[0])} " \
+                          f"{thresholds[analysis].location} range " \
+                          f"{thresholds[analysis].rng}"
 
                 else:
-                    exception_msg = f"{xpath}: Value {location} range {rng}"
-                    if warning:
-                        raise WarningException(exception_msg)
+                    msg = self._range_msg(
+                        xpath, node, failing[analysis], thresholds[analysis]
+                    )
 
-                    else:
-                        raise CriticalException(exception_msg)
+                raise exception(msg)
 
-        except ValueError:
-            raise CriticalException(f"{xpath}: Node values are not numbers")
+        return "OK"
+
+    def _validate_thresholds(self, xpath, threshold, warning=False):
+        if warning:
+            return self.thresholds(xpath=xpath, warning=threshold)
+
+        else:
+            return self.thresholds(xpath=xpath, critical=threshold)
 
     def warning(self, xpath, threshold):
         return self._validate_thresholds(
@@ -199,21 +880,13 @@ class XML:
         return self._validate_thresholds(xpath=xpath, threshold=threshold)
 
     def check_if_younger(self, xpath, age, time_format):
-        def calculate_timedelta(item):
-            now = get_date_now()
-
-            if time_format == "UNIX":
-                dt = now - datetime.datetime.utcfromtimestamp(int(item))
-
-            else:
-                dt = now - datetime.datetime.strptime(item, time_format)
-
-            return dt.seconds / 3600.
-
         node = self.parse(xpath=xpath)
+        now = get_date_now()
 
         if isinstance(node, list):
-            younger = [calculate_timedelta(item) < age for item in node]
+            younger = [
+                hours < age for hours in ages(node, time_format, now)
+            ]
 
             if False not in younger:
                 return True
@@ -230,7 +903,7 @@ class XML:
                     )
 
         else:
-            younger = calculate_timedelta(node) < age
+            younger = ages([node], time_format, now)[0] < age
 
             if younger:
                 return True
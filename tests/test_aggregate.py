@@ -0,0 +1,41 @@
+import unittest
+
+from argo_probe_xml.aggregate import aggregate, is_valid
+
+values = ["5", "4", "59", "15", "0", "0", "3"]
+
+
+class AggregateTests(unittest.TestCase):
+    def test_is_valid(self):
+        for spec in ["sum", "avg", "min", "max", "count", "p95", "p99.9"]:
+            self.assertTrue(is_valid(spec))
+
+        for spec in ["mean", "p", "p101", "95", "sum:", ""]:
+            self.assertFalse(is_valid(spec))
+
+    def test_aggregate(self):
+        self.assertEqual(aggregate(values, "sum"), 86.)
+        self.assertAlmostEqual(aggregate(values, "avg"), 86 / 7)
+        self.assertEqual(aggregate(values, "min"), 0.)
+        self.assertEqual(aggregate(values, "max"), 59.)
+        self.assertEqual(aggregate(values, "count"), 7.)
+        self.assertEqual(aggregate(["5"], "sum"), 5.)
+
+    def test_percentile(self):
+        self.assertEqual(aggregate(values, "p0"), 0.)
+        self.assertEqual(aggregate(values, "p50"), 4.)
+        self.assertEqual(aggregate(values, "p100"), 59.)
+        self.assertAlmostEqual(aggregate(values, "p95"), 45.8)
+        self.assertEqual(aggregate(["1", "2"], "p50"), 1.5)
+
+    def test_aggregate_invalid(self):
+        with self.assertRaises(ValueError):
+            aggregate(values, "mean")
+
+        with self.assertRaises(ValueError):
+            aggregate(["5", "test"], "sum")
+
+        with self.assertRaises(ValueError):
+            aggregate([], "avg")
+
+        self.assertEqual(aggregate([], "count"), 0.)
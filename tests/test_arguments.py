@@ -64,6 +64,68 @@ class ArgsTests(unittest.TestCase):
         self.assertFalse(self.entries_without_node.check_validity())
         self.assertTrue(self.single_xpath.check_validity())
 
+    def test_check_thresholds(self):
+        self.assertTrue(self.ok_args.check_thresholds())
+        self.assertTrue(self.no_optional_args.check_thresholds())
+        self.assertTrue(self.single_xpath.check_thresholds())
+        self.assertFalse(
+            Args(args={
+                "xpath": ["/mock/path1", "/mock/path2"],
+                "ok": None,
+                "warning": ["path1:10", "path2:x10"],
+                "critical": None,
+                "age": None
+            }).check_thresholds()
+        )
+        self.assertFalse(
+            Args(args={
+                "xpath": ["/mock/path1"],
+                "ok": None,
+                "warning": None,
+                "critical": ["5@0:"],
+                "age": None
+            }).check_thresholds()
+        )
+
+    def test_check_aggregates(self):
+        self.assertTrue(self.ok_args.check_aggregates())
+        args = {
+            "xpath": ["/mock/path1", "/mock/path2"],
+            "ok": ["path1:bla"],
+            "warning": ["path2:10"],
+            "critical": None,
+            "age": None,
+            "aggregate": ["path2:p95"]
+        }
+        self.assertTrue(Args(args=args).check_validity())
+        self.assertTrue(Args(args=args).check_aggregates())
+        self.assertEqual(Args(args=args).aggregate4node("path2"), "p95")
+        self.assertEqual(Args(args=args).aggregate4node("path1"), None)
+        self.assertFalse(
+            Args(args=dict(args, aggregate=["path2:mean"])).check_aggregates()
+        )
+        self.assertFalse(
+            Args(args=dict(args, aggregate=["path1:sum"])).check_aggregates()
+        )
+        self.assertFalse(
+            Args(args=dict(args, aggregate=["sum"])).check_validity()
+        )
+
+    def test_arg4node_with_namespace_prefix(self):
+        args = Args(args={
+            "xpath": ["/glue:Domains/glue:ID", "/glue:Domains/glue:Jobs"],
+            "ok": ["glue:ID:site:1"],
+            "warning": ["glue:Jobs:10:20"],
+            "critical": None,
+            "age": None
+        })
+        self.assertTrue(args.check_validity())
+        self.assertTrue(args.check_mutually_exclusive())
+        self.assertTrue(args.check_thresholds())
+        self.assertEqual(args.ok4node("glue:ID"), "site:1")
+        self.assertEqual(args.warning4node("glue:Jobs"), "10:20")
+        self.assertEqual(args.warning4node("glue:ID"), None)
+
     def test_arg4node(self):
         self.assertEqual(self.ok_args.ok4node("path1"), "bla")
         self.assertEqual(self.ok_args.ok4node("path2"), None)
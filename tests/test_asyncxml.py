@@ -0,0 +1,159 @@
+import asyncio
+import gzip
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from argo_probe_xml import asyncxml
+from argo_probe_xml.asyncxml import AsyncXML
+from argo_probe_xml.exceptions import CriticalException
+
+xml = b"<aris>" \
+      b"<lastUpdate>1659507301</lastUpdate>" \
+      b"<partition><running_jobs>59</running_jobs></partition>" \
+      b"<partition><running_jobs>4</running_jobs></partition>" \
+      b"</aris>"
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+
+    finally:
+        loop.close()
+
+
+class AsyncXMLTests(unittest.TestCase):
+    def setUp(self):
+        self.xml = AsyncXML("https://mock.url.com")
+        self.calls = 0
+
+    async def mock_aget_ok(self):
+        self.calls += 1
+        yield xml[:10]
+        yield xml[10:]
+
+    async def mock_aget_500(self):
+        self.calls += 1
+        raise CriticalException("500 BAD REQUEST")
+        yield
+
+    def test_fetch(self):
+        with patch.object(self.xml, "_aiter_get", self.mock_aget_ok):
+            run(self.xml.fetch())
+            run(self.xml.fetch())
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.xml.parse("/aris/lastUpdate"), "1659507301")
+
+    def test_fetch_compressed(self):
+        data = gzip.compress(xml)
+
+        async def mock_aget():
+            for i in range(0, len(data), 7):
+                yield data[i:i + 7]
+
+        with patch.object(self.xml, "_aiter_get", mock_aget):
+            run(self.xml.fetch())
+
+        self.assertEqual(self.xml.parse("/aris/lastUpdate"), "1659507301")
+
+    def test_fetch_invalid(self):
+        closed = []
+
+        async def mock_aget():
+            try:
+                yield b"<aris><lastUpdate>"
+                yield b"</aris>"
+                yield xml
+
+            finally:
+                closed.append(1)
+
+        with patch.object(self.xml, "_aiter_get", mock_aget):
+            run(self.xml.fetch())
+
+        with self.assertRaises(CriticalException) as context:
+            self.xml.parse()
+
+        self.assertTrue(
+            context.exception.__str__().startswith("Unable to parse xml: ")
+        )
+        self.assertEqual(closed, [1])
+
+    def test_fetch_with_exception(self):
+        with patch.object(self.xml, "_aiter_get", self.mock_aget_500):
+            run(self.xml.fetch())
+
+        with self.assertRaises(CriticalException) as context:
+            self.xml.parse()
+
+        self.assertEqual(context.exception.__str__(), "500 BAD REQUEST")
+
+    def test_run(self):
+        with patch.object(self.xml, "_aiter_get", self.mock_aget_ok):
+            self.assertEqual(
+                run(self.xml.run(
+                    "critical", xpath="/aris/partition/running_jobs",
+                    threshold="60"
+                )), "OK"
+            )
+            self.assertEqual(
+                run(self.xml.run(
+                    "parse", xpath="/aris/partition/running_jobs"
+                )), ["59", "4"]
+            )
+
+        self.assertEqual(self.calls, 1)
+
+    def test_parse_without_fetch(self):
+        with self.assertRaises(RuntimeError):
+            self.xml.parse()
+
+    def test_check_invalid_target(self):
+        nagios = run(asyncxml.check_target(
+            None, {"url": "https://mock.url.com", "age": "3"}, 10
+        ))
+        self.assertEqual(
+            nagios.get_msg(),
+            "UNKNOWN - Argument --time-format is mandatory with --age argument"
+        )
+
+    def test_check_unsupported_target(self):
+        nagios = run(asyncxml.check_target(
+            None,
+            {"url": "https://mock.url.com", "stream": True, "retries": 2}, 10
+        ))
+        self.assertEqual(
+            nagios.get_msg(),
+            "UNKNOWN - Keys stream, retries are not supported by the "
+            "asynchronous client"
+        )
+
+    def test_check_target_options(self):
+        target = {
+            "url": "https://mock.url.com", "xpath": "/a:aris/a:lastUpdate",
+            "namespace": "a=urn:aris", "critical": "1659507302"
+        }
+        data = xml.replace(b"<aris>", b"<aris xmlns='urn:aris'>")
+
+        async def mock_aget(xml_self):
+            yield data
+
+        with patch.object(AsyncXML, "_aiter_get", mock_aget):
+            nagios = run(asyncxml.check_target(None, target, 10))
+
+        self.assertEqual(nagios.get_code(), 0)
+
+    def test_check_local_file(self):
+        with tempfile.NamedTemporaryFile("wb", suffix=".xml") as f:
+            f.write(xml)
+            f.flush()
+            nagios = run(asyncxml.check_target(
+                None, {"url": f.name, "xpath": "/aris/lastUpdate"}, 10
+            ))
+
+        self.assertEqual(
+            nagios.get_msg(), "OK - Node with XPath '/aris/lastUpdate' found"
+        )
@@ -0,0 +1,244 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from argo_probe_xml import batch
+from argo_probe_xml.exceptions import CriticalException
+from argo_probe_xml.nagios import Nagios
+
+xml = b"<aris>" \
+      b"<partition><running_jobs>59</running_jobs></partition>" \
+      b"<partition><running_jobs>4</running_jobs></partition>" \
+      b"</aris>"
+
+targets = [
+    {
+        "url": "https://mock1.url.com/status.xml",
+        "host": "mock1.host.com",
+        "service": "org.mock.jobs",
+        "xpath": "/aris/partition/running_jobs",
+        "critical": "0:60"
+    },
+    {
+        "url": "https://mock2.url.com/status.xml",
+        "xpath": ["/aris/partition/running_jobs"],
+        "warning": ["0:50"]
+    },
+    {
+        "url": "https://mock3.url.com/status.xml",
+        "xpath": ["/aris/a", "/aris/b"],
+        "ok": ["up"]
+    }
+]
+
+
+class BatchTests(unittest.TestCase):
+    def test_load_targets(self):
+        with tempfile.NamedTemporaryFile("w", delete=False) as f:
+            json.dump(targets, f)
+
+        try:
+            self.assertEqual(batch.load_targets(f.name), targets)
+
+        finally:
+            os.remove(f.name)
+
+    def test_load_targets_without_url(self):
+        with tempfile.NamedTemporaryFile("w", delete=False) as f:
+            json.dump([{"xpath": "/a/b"}], f)
+
+        try:
+            with self.assertRaises(ValueError) as context:
+                batch.load_targets(f.name)
+
+            self.assertEqual(
+                context.exception.__str__(),
+                f"{f.name}: Target 0 is missing URL"
+            )
+
+        finally:
+            os.remove(f.name)
+
+    def test_target_args(self):
+        args = batch.target_args(targets[0], 10, tree_ttl=60)
+        self.assertEqual(args["xpath"], ["/aris/partition/running_jobs"])
+        self.assertEqual(args["timeout"], 10.)
+        self.assertEqual(args["tree_ttl"], 60.)
+        self.assertFalse(args["no_entities"])
+        self.assertTrue(
+            batch.target_args(dict(targets[0], no_entities=True), 10)[
+                "no_entities"
+            ]
+        )
+        self.assertEqual(
+            batch.target_args(dict(targets[0], tree_ttl=5), 10)["tree_ttl"],
+            5.
+        )
+
+    def test_target_args_retry(self):
+        args = batch.target_args(targets[0], 10)
+        self.assertIsNone(args["retries"])
+        self.assertIsNone(args["hedge"])
+        args = batch.target_args(
+            dict(targets[0], retries=3, connect_timeout="5"), 10,
+            retry={"retries": 1, "deadline": 20, "hedge": "p95"}
+        )
+        self.assertEqual(args["retries"], 3)
+        self.assertEqual(args["connect_timeout"], 5.)
+        self.assertEqual(args["deadline"], 20.)
+        self.assertEqual(args["hedge"], "p95")
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_run(self, mock_get):
+        mock_get.side_effect = [xml, CriticalException("500 BAD REQUEST")]
+        results = list(batch.run(targets=targets, timeout=10, workers=1))
+        self.assertEqual([target for target, _ in results], targets)
+        self.assertEqual(
+            [nagios.get_code() for _, nagios in results], [0, 2, 3]
+        )
+        self.assertEqual(results[1][1].get_msg(), "CRITICAL - 500 BAD REQUEST")
+        self.assertEqual(
+            results[2][1].get_msg(),
+            "UNKNOWN - When testing for multiple XPaths, optional arguments "
+            "must have '<node_name>:' prefix"
+        )
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_run_with_malformed_targets(self, mock_get):
+        mock_get.return_value = xml
+        malformed = [
+            {
+                "url": "https://mock4.url.com/status.xml",
+                "xpath": ["/aris/partition/running_jobs"], "critical": [40]
+            },
+            {"url": "https://mock5.url.com/status.xml", "xpath": [1]},
+            {"url": "https://mock6.url.com/status.xml", "timeout": "x"}
+        ]
+        results = list(batch.run(
+            targets=targets[:1] + malformed + targets[1:2], timeout=10,
+            workers=2
+        ))
+        self.assertEqual(
+            [nagios.get_code() for _, nagios in results], [0, 2, 0, 3, 1]
+        )
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_run_with_unexpected_error(self, mock_get):
+        mock_get.return_value = xml
+        with patch(
+                "argo_probe_xml.batch.XML", side_effect=RuntimeError("bug")
+        ):
+            results = list(batch.run(targets=targets[:2], timeout=10))
+
+        self.assertEqual(
+            [nagios.get_msg() for _, nagios in results],
+            ["UNKNOWN - Unable to check target: bug"] * 2
+        )
+
+    @patch("argo_probe_xml.xml.XML._get", autospec=True)
+    def test_check_documents(self, mock_get):
+        documents = {
+            "https://mock1.url.com/status.xml": xml,
+            "https://mock2.url.com/status.xml": xml,
+            "https://mock3.url.com/status.xml": xml.replace(b"59", b"60")
+        }
+        mock_get.side_effect = lambda self: documents[self.url]
+        args = {
+            "timeout": 10,
+            "xpath": ["/aris/partition/running_jobs"],
+            "ok": None,
+            "warning": ["0:59"],
+            "critical": None,
+            "age": None,
+            "time_format": None,
+            "stream": False,
+            "consistent": ["/aris/partition/running_jobs"]
+        }
+        nagios = batch.check_documents(
+            urls=list(documents)[:2], args=args, workers=2
+        )
+        self.assertEqual(
+            nagios.get_msg(),
+            "OK - All the documents pass\n"
+            "https://mock1.url.com/status.xml: OK\n"
+            "https://mock2.url.com/status.xml: OK\n"
+            "/aris/partition/running_jobs: Values equal in all the documents"
+        )
+
+        nagios = batch.check_documents(urls=list(documents), args=args)
+        self.assertEqual(
+            nagios.get_msg(),
+            "CRITICAL - Some documents do not pass\n"
+            "https://mock1.url.com/status.xml: OK\n"
+            "https://mock2.url.com/status.xml: OK\n"
+            "https://mock3.url.com/status.xml: WARNING - "
+            "/aris/partition/running_jobs: Partition 0 value outside range "
+            "[0.0, 59.0]\n"
+            "/aris/partition/running_jobs: Values differ between the "
+            "documents: https://mock1.url.com/status.xml: ['59', '4'], "
+            "https://mock2.url.com/status.xml: ['59', '4'], "
+            "https://mock3.url.com/status.xml: ['60', '4']"
+        )
+        self.assertEqual(nagios.get_code(), 2)
+
+    @patch("argo_probe_xml.xml.XML._get", autospec=True)
+    def test_check_documents_undefined_prefix(self, mock_get):
+        mock_get.return_value = xml
+        args = {
+            "timeout": 10, "xpath": None, "ok": None, "warning": None,
+            "critical": None, "age": None, "time_format": None,
+            "stream": False, "consistent": ["/x:aris"]
+        }
+        nagios = batch.check_documents(
+            urls=["https://mock1.url.com", "https://mock2.url.com"],
+            args=args, workers=2
+        )
+        self.assertEqual(nagios.get_code(), 3)
+        self.assertIn(
+            "/x:aris: Unable to compare values: Undefined namespace prefix",
+            nagios.get_msg()
+        )
+
+    def test_format_passive(self):
+        nagios = Nagios()
+        nagios.warning("First warning")
+        nagios.ok("Something ok")
+        nagios.set_final_msg("Some checks do not pass")
+        self.assertEqual(
+            batch.format_passive(targets[0], nagios, timestamp=1660199401),
+            "[1660199401] PROCESS_SERVICE_CHECK_RESULT;mock1.host.com;"
+            "org.mock.jobs;1;WARNING - Some checks do not pass\\n"
+            "First warning\\nSomething ok"
+        )
+        self.assertEqual(
+            batch.format_passive(targets[1], Nagios(), timestamp=1660199401),
+            "[1660199401] PROCESS_SERVICE_CHECK_RESULT;mock2.url.com;"
+            "check_xml;0;OK"
+        )
+        self.assertEqual(
+            batch.format_passive(
+                {"url": "/var/lib/status.xml"}, Nagios(), timestamp=1660199401
+            ),
+            "[1660199401] PROCESS_SERVICE_CHECK_RESULT;localhost;"
+            "check_xml;0;OK"
+        )
+
+    def test_format_json(self):
+        nagios = Nagios()
+        nagios.critical("Something wrong")
+        self.assertEqual(
+            json.loads(
+                batch.format_json(targets[1], nagios, timestamp=1660199401)
+            ),
+            {
+                "timestamp": 1660199401,
+                "host": "mock2.url.com",
+                "service": "check_xml",
+                "url": "https://mock2.url.com/status.xml",
+                "status": "CRITICAL",
+                "code": 2,
+                "message": "CRITICAL - Something wrong"
+            }
+        )
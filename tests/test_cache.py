@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from argo_probe_xml.cache import ResponseCache
+
+xml = b"<aris><lastUpdate>1659507301</lastUpdate></aris>"
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ResponseCache(directory=self.directory, max_age=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_store_and_get(self):
+        self.assertIsNone(self.cache.get("https://mock.url.com"))
+        self.cache.store(
+            "https://mock.url.com", {
+                "ETag": '"abc"',
+                "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"
+            }, xml
+        )
+        entry = self.cache.get("https://mock.url.com")
+        self.assertEqual(entry.read(), xml)
+        self.assertEqual(
+            entry.headers(), {
+                "If-None-Match": '"abc"',
+                "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"
+            }
+        )
+        self.assertEqual(b"".join(entry.iter_read(10)), xml)
+        self.assertIsNone(self.cache.get("https://mock2.url.com"))
+
+    def test_get_expired(self):
+        self.cache.store("https://mock.url.com", {"ETag": '"abc"'}, xml)
+        self.cache.max_age = 0
+        time.sleep(0.01)
+        self.assertIsNone(self.cache.get("https://mock.url.com"))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_is_cacheable(self):
+        self.assertTrue(ResponseCache.is_cacheable({"ETag": '"abc"'}))
+        self.assertTrue(
+            ResponseCache.is_cacheable(
+                {"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+            )
+        )
+        self.assertFalse(ResponseCache.is_cacheable({}))
+
+    def test_iter_store_incomplete(self):
+        chunks = self.cache.iter_store(
+            "https://mock.url.com", {"ETag": '"abc"'}, [xml[:10], xml[10:]]
+        )
+        self.assertEqual(next(chunks), xml[:10])
+        chunks.close()
+        self.assertIsNone(self.cache.get("https://mock.url.com"))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_evict_least_recently_used(self):
+        self.cache.max_size = 2 * len(xml)
+        self.cache.store("https://mock1.url.com", {"ETag": '"1"'}, xml)
+        self.cache.store("https://mock2.url.com", {"ETag": '"2"'}, xml)
+        for i, url in enumerate(
+                ["https://mock1.url.com", "https://mock2.url.com"]
+        ):
+            path = self.cache.get(url).path
+            os.utime(path, (time.time() - 10 + i, time.time() - 10 + i))
+
+        self.cache.get("https://mock1.url.com")
+        self.cache.store("https://mock3.url.com", {"ETag": '"3"'}, xml)
+        self.assertIsNotNone(self.cache.get("https://mock1.url.com"))
+        self.assertIsNone(self.cache.get("https://mock2.url.com"))
+        self.assertIsNotNone(self.cache.get("https://mock3.url.com"))
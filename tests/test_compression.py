@@ -0,0 +1,106 @@
+import bz2
+import gzip
+import lzma
+import unittest
+
+from argo_probe_xml.compression import Decompressor, decompress
+from argo_probe_xml.exceptions import CriticalException
+
+xml = b"<aris>" + \
+      b"<partition><running_jobs>59</running_jobs></partition>" * 1000 + \
+      b"</aris>"
+
+
+def chunks(data, size=3):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def push(data, size=3, chunk_size=100):
+    decompressor = Decompressor(chunk_size=chunk_size)
+    pieces = []
+    for chunk in chunks(data, size=size):
+        pieces.extend(decompressor.feed(chunk))
+
+    return pieces + list(decompressor.close())
+
+
+def failing_chunks(data):
+    yield data[:10]
+    raise IOError("Connection broken")
+
+
+class DecompressTests(unittest.TestCase):
+    def test_uncompressed(self):
+        self.assertEqual(b"".join(decompress(chunks(xml))), xml)
+        self.assertEqual(b"".join(decompress([xml])), xml)
+        self.assertEqual(b"".join(decompress([b"<a/>"])), b"<a/>")
+        self.assertEqual(b"".join(decompress([])), b"")
+
+    def test_decompress(self):
+        for compress in [gzip.compress, bz2.compress, lzma.compress]:
+            self.assertEqual(
+                b"".join(decompress(chunks(compress(xml)))), xml
+            )
+
+    def test_decompress_in_pieces(self):
+        pieces = list(decompress([gzip.compress(xml)], chunk_size=100))
+        self.assertEqual(b"".join(pieces), xml)
+        self.assertEqual(max(len(piece) for piece in pieces), 100)
+
+    def test_decompress_concatenated_streams(self):
+        data = gzip.compress(xml[:100]) + gzip.compress(xml[100:])
+        self.assertEqual(b"".join(decompress(chunks(data, size=50))), xml)
+
+    def test_decompress_truncated(self):
+        with self.assertRaises(CriticalException) as context:
+            b"".join(decompress([bz2.compress(xml)[:-10]]))
+
+        self.assertTrue(
+            context.exception.__str__().startswith(
+                "Unable to decompress XML document: "
+            )
+        )
+
+    def test_decompress_invalid(self):
+        with self.assertRaises(CriticalException):
+            b"".join(decompress([b"\x1f\x8b" + b"x" * 100]))
+
+    def test_decompress_with_connection_error(self):
+        with self.assertRaises(IOError) as context:
+            b"".join(decompress(failing_chunks(gzip.compress(xml))))
+
+        self.assertEqual(context.exception.__str__(), "Connection broken")
+
+
+class DecompressorTests(unittest.TestCase):
+    def test_uncompressed(self):
+        self.assertEqual(b"".join(push(xml)), xml)
+        self.assertEqual(b"".join(push(b"<a/>")), b"<a/>")
+        self.assertEqual(push(b""), [])
+
+    def test_decompress(self):
+        for compress in [gzip.compress, bz2.compress, lzma.compress]:
+            for size in [1, 50, len(xml)]:
+                pieces = push(compress(xml), size=size)
+                self.assertEqual(b"".join(pieces), xml)
+                self.assertEqual(max(len(piece) for piece in pieces), 100)
+
+    def test_decompress_concatenated_streams(self):
+        data = gzip.compress(xml[:100]) + gzip.compress(xml[100:])
+        self.assertEqual(b"".join(push(data, size=50)), xml)
+
+    def test_decompress_truncated(self):
+        for compress in [gzip.compress, bz2.compress, lzma.compress]:
+            with self.assertRaises(CriticalException) as context:
+                push(compress(xml)[:-10])
+
+            self.assertTrue(
+                context.exception.__str__().startswith(
+                    "Unable to decompress XML document: "
+                )
+            )
+
+    def test_decompress_invalid(self):
+        with self.assertRaises(CriticalException):
+            push(b"\x1f\x8b" + b"x" * 100)
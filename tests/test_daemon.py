@@ -0,0 +1,104 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import argo_probe_xml
+from argo_probe_xml import daemon
+
+CHECK_XML = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src", "check_xml"
+)
+
+
+def mock_probe(argv, cwd):
+    if argv == ["-x"]:
+        raise ValueError("Something went wrong")
+
+    return f"OK - {' '.join(argv)}\n", cwd, 0
+
+
+class DaemonTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "probe.sock")
+        self.server = threading.Thread(
+            target=daemon.serve, args=(self.path, mock_probe), daemon=True
+        )
+        self.server.start()
+        for _ in range(100):
+            if os.path.exists(self.path):
+                break
+
+            time.sleep(0.01)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_request(self):
+        self.assertEqual(
+            daemon.request(self.path, ["-u", "https://mock.url.com"]),
+            ("OK - -u https://mock.url.com\n", os.getcwd(), 0)
+        )
+
+    def test_request_with_exception(self):
+        self.assertEqual(
+            daemon.request(self.path, ["-x"]),
+            ("UNKNOWN - Something went wrong\n", "", 3)
+        )
+
+    def test_request_without_daemon(self):
+        stdout, stderr, code = daemon.request(
+            os.path.join(self.directory, "nonexisting.sock"), []
+        )
+        self.assertTrue(
+            stdout.startswith("UNKNOWN - Unable to get result from probe "
+                              "daemon: ")
+        )
+        self.assertEqual(code, 3)
+
+
+@unittest.skipUnless(os.path.exists(CHECK_XML), "check_xml is not available")
+class ProbeDaemonTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "probe.sock")
+        self.env = dict(os.environ)
+        self.env["PYTHONPATH"] = os.pathsep.join(
+            [os.path.dirname(os.path.dirname(argo_probe_xml.__file__))] +
+            [item for item in [self.env.get("PYTHONPATH")] if item]
+        )
+        self.server = subprocess.Popen(
+            [sys.executable, CHECK_XML, "--serve", self.path],
+            cwd="/", env=self.env
+        )
+        for _ in range(500):
+            if os.path.exists(self.path):
+                break
+
+            time.sleep(0.01)
+
+    def tearDown(self):
+        self.server.terminate()
+        self.server.wait(10)
+        shutil.rmtree(self.directory)
+
+    def test_relative_paths(self):
+        with open(os.path.join(self.directory, "mock.xml"), "w") as f:
+            f.write("<aris><lastUpdate>1659507301</lastUpdate></aris>")
+
+        process = subprocess.run(
+            [
+                sys.executable, CHECK_XML, "--socket", self.path,
+                "-u", "mock.xml", "-t", "30", "-x", "/aris/lastUpdate"
+            ],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            cwd=self.directory, env=self.env, universal_newlines=True
+        )
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertTrue(process.stdout.startswith("OK - "))
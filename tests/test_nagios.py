@@ -128,3 +128,20 @@ class NagiosTests(unittest.TestCase):
             "Third thing ok"
         )
         self.assertEqual(self.nagios.get_code(), 3)
+
+    def test_perfdata(self):
+        self.nagios.ok("Everything is ok")
+        self.nagios.ok("The other stuff is also ok")
+        self.nagios.set_final_msg("All in all - ok")
+        self.nagios.add_perfdata("jobs", 59., warning="0:100", critical="@5")
+        self.nagios.add_perfdata(
+            "time parse", 0.0012345678, uom="s", minimum=0
+        )
+        self.nagios.add_perfdata("size=all", 2048, uom="B")
+        self.assertEqual(
+            self.nagios.get_msg(),
+            "OK - All in all - ok | jobs=59;0:100;@5 "
+            "'time parse'=0.001235s;;;0 size_all=2048B\n"
+            "Everything is ok\nThe other stuff is also ok"
+        )
+        self.assertEqual(self.nagios.get_code(), 0)
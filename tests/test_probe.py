@@ -0,0 +1,256 @@
+import unittest
+from unittest.mock import patch
+
+from argo_probe_xml.probe import check, validate
+from argo_probe_xml.xml import XML
+
+xml = b"<aris>" \
+      b"<lastUpdate>1659507301</lastUpdate>" \
+      b"<partition>" \
+      b"<running_jobs>59</running_jobs>" \
+      b"<state_up>up</state_up>" \
+      b"</partition>" \
+      b"<partition>" \
+      b"<running_jobs>4</running_jobs>" \
+      b"<state_up>down</state_up>" \
+      b"</partition>" \
+      b"</aris>"
+
+
+def mock_args(**kwargs):
+    args = {
+        "url": "https://mock.url.com",
+        "timeout": 30,
+        "xpath": None,
+        "ok": None,
+        "warning": None,
+        "critical": None,
+        "age": None,
+        "time_format": None,
+        "stream": False
+    }
+    args.update(kwargs)
+    return args
+
+
+class ValidateTests(unittest.TestCase):
+    def test_validate_ok(self):
+        self.assertIsNone(validate(mock_args()))
+        self.assertIsNone(
+            validate(mock_args(
+                xpath=["/mock/path1", "/mock/path2"], ok=["path1:bla"],
+                warning=["path2:10"], critical=["path2:20"]
+            ))
+        )
+
+    def test_validate_missing_prefix(self):
+        self.assertEqual(
+            validate(mock_args(xpath=["/mock/path1", "/mock/path2"], ok=["a"])),
+            "When testing for multiple XPaths, optional arguments must have "
+            "'<node_name>:' prefix"
+        )
+
+    def test_validate_mutually_exclusive(self):
+        self.assertEqual(
+            validate(mock_args(xpath=["/mock/path"], ok=["a"], age=["2"])),
+            "Arguments --ok [-w | -c] --age are mutually exclusive for each "
+            "XPath"
+        )
+
+    def test_validate_invalid_threshold(self):
+        self.assertEqual(
+            validate(mock_args(xpath=["/mock/path"], warning=["x10"])),
+            "Invalid format of warning or critical threshold"
+        )
+
+    def test_validate_invalid_aggregate(self):
+        msg = "Argument --aggregate must be one of sum, avg, min, max, " \
+              "count or p<percentile>, and cannot be used with --ok or " \
+              "--age for the same XPath"
+        self.assertIsNone(
+            validate(mock_args(
+                xpath=["/mock/path"], critical=["10"], aggregate=["p95"]
+            ))
+        )
+        self.assertEqual(
+            validate(mock_args(xpath=["/mock/path"], aggregate=["mean"])), msg
+        )
+        self.assertEqual(
+            validate(mock_args(
+                xpath=["/mock/path"], ok=["10"], aggregate=["sum"]
+            )), msg
+        )
+
+    def test_validate_invalid_namespace(self):
+        self.assertIsNone(
+            validate(mock_args(
+                xpath=["/a:feed/a:updated"], stream=True,
+                namespace=["a=http://www.w3.org/2005/Atom"]
+            ))
+        )
+        self.assertEqual(
+            validate(mock_args(xpath=["/a:feed"], namespace=["a"])),
+            "Invalid namespace a: must be given as prefix=uri"
+        )
+
+    def test_validate_invalid_consistent(self):
+        self.assertIsNone(
+            validate(mock_args(consistent=["/a:b/c", "count(/a)"]))
+        )
+        self.assertEqual(
+            validate(mock_args(consistent=["/a", "count(("])),
+            "Invalid XPath count(( in --consistent argument: Invalid "
+            "expression"
+        )
+
+    def test_validate_retry(self):
+        self.assertIsNone(
+            validate(mock_args(
+                connect_timeout=5, retries=2, deadline=20, hedge="p95"
+            ))
+        )
+        self.assertEqual(
+            validate(mock_args(retries=-1)),
+            "Argument --retries must be a non-negative integer"
+        )
+        self.assertEqual(
+            validate(mock_args(deadline=0)),
+            "Argument --deadline must be positive"
+        )
+        self.assertEqual(
+            validate(mock_args(hedge="avg")),
+            "Argument --hedge must be given in seconds or as p<percentile> "
+            "of the previous response times"
+        )
+
+    def test_validate_missing_time_format(self):
+        self.assertEqual(
+            validate(mock_args(xpath=["/mock/path"], age=["2"])),
+            "Argument --time-format is mandatory with --age argument"
+        )
+
+    def test_validate_stream(self):
+        self.assertIsNone(validate(mock_args(xpath=["/a/b"], stream=True)))
+        self.assertEqual(
+            validate(mock_args(xpath=["/a/b[1]"], stream=True)),
+            "Only simple absolute XPaths can be used with --stream argument"
+        )
+        self.assertEqual(
+            validate(
+                mock_args(xpath=["/a/b"], consistent=["/a[1]/c"], stream=True)
+            ),
+            "Only simple absolute XPaths can be used with --stream argument"
+        )
+        self.assertEqual(
+            validate(mock_args(xpath=["/a/b[1]"], partial=True)),
+            "Only simple absolute XPaths can be used with --partial argument"
+        )
+        self.assertEqual(
+            validate(mock_args(partial=True)),
+            "Argument --partial must be used with -x argument"
+        )
+
+
+class CheckTests(unittest.TestCase):
+    def setUp(self):
+        self.xml = XML("https://mock.url.com")
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_check_without_xpath(self, mock_get):
+        mock_get.return_value = xml
+        nagios = check(self.xml, mock_args())
+        self.assertEqual(nagios.get_msg(), "OK - Response OK")
+        self.assertEqual(nagios.get_code(), 0)
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_check_multiple_xpaths(self, mock_get):
+        mock_get.return_value = xml
+        nagios = check(
+            self.xml, mock_args(
+                xpath=[
+                    "/aris/lastUpdate", "/aris/partition/state_up",
+                    "/aris/partition/running_jobs"
+                ],
+                ok=["state_up:up"], critical=["running_jobs:0:50"]
+            )
+        )
+        self.assertEqual(
+            nagios.get_msg(),
+            "CRITICAL - Some checks do not pass\n"
+            "Node with XPath '/aris/lastUpdate' found\n"
+            "/aris/partition/state_up: Not all nodes' values equal to 'up'\n"
+            "/aris/partition/running_jobs: Partition 0 value outside range "
+            "[0.0, 50.0]"
+        )
+        self.assertEqual(nagios.get_code(), 2)
+        mock_get.assert_called_once()
+
+    @patch("argo_probe_xml.xml.XML.thresholds")
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_check_warning_and_critical(self, mock_get, mock_thresholds):
+        mock_get.return_value = xml
+        mock_thresholds.return_value = "OK"
+        nagios = check(
+            self.xml, mock_args(
+                xpath=["/aris/partition/running_jobs"], warning=["50"],
+                critical=["100"]
+            )
+        )
+        self.assertEqual(nagios.get_msg(), "OK")
+        mock_thresholds.assert_called_once_with(
+            xpath="/aris/partition/running_jobs", warning="50",
+            critical="100", aggregate=None
+        )
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_check_perfdata(self, mock_get):
+        mock_get.return_value = xml
+        nagios = check(
+            self.xml, mock_args(
+                xpath=["/aris/lastUpdate", "/aris/partition/running_jobs"],
+                warning=["running_jobs:0:50"], critical=["lastUpdate:0:"],
+                perfdata=True
+            )
+        )
+        self.assertRegex(
+            nagios.get_msg(),
+            r"^WARNING - Some checks do not pass \| "
+            r"lastUpdate=1659507301;;0: running_jobs_min=4;0:50 "
+            r"running_jobs_max=59;0:50 time_parse=[0-9.]+s;;;0 "
+            r"time_xpath_lastUpdate=[0-9.]+s;;;0 "
+            r"time_xpath_running_jobs=[0-9.]+s;;;0\n"
+        )
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_check_aggregate(self, mock_get):
+        mock_get.return_value = xml
+        nagios = check(
+            self.xml, mock_args(
+                xpath=["/aris/lastUpdate", "/aris/partition/running_jobs"],
+                warning=["running_jobs:0:50"], critical=["running_jobs:0:100"],
+                aggregate=["running_jobs:sum"], perfdata=True
+            )
+        )
+        self.assertRegex(
+            nagios.get_msg(),
+            r"^WARNING - Some checks do not pass \| "
+            r"running_jobs_sum=63;0:50;0:100 time_parse=[0-9.]+s;;;0 "
+            r"time_xpath_lastUpdate=[0-9.]+s;;;0 "
+            r"time_xpath_running_jobs=[0-9.]+s;;;0\n"
+            r"Node with XPath '/aris/lastUpdate' found\n"
+            r"/aris/partition/running_jobs: Sum value 63 outside range "
+            r"\[0.0, 50.0\]$"
+        )
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_check_without_perfdata(self, mock_get):
+        mock_get.return_value = xml
+        nagios = check(
+            self.xml, mock_args(
+                xpath=["/aris/partition/running_jobs"], critical=["0:100"]
+            )
+        )
+        self.assertEqual(
+            nagios.get_msg(),
+            "OK - Node with XPath '/aris/partition/running_jobs' found"
+        )
@@ -0,0 +1,141 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from argo_probe_xml import retry
+from argo_probe_xml.retry import RetryPolicy, hedged, is_valid_hedge, \
+    latency_percentile, record_latency
+
+
+class MockResponse:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class RetryPolicyTests(unittest.TestCase):
+    def test_delay(self):
+        policy = RetryPolicy(retries=10, backoff=0.5)
+        with patch("argo_probe_xml.retry.random.uniform") as mock_uniform:
+            mock_uniform.side_effect = lambda low, high: high
+            self.assertEqual(
+                [policy.delay(attempt) for attempt in range(7)],
+                [0.5, 1., 2., 4., 8., 8., 8.]
+            )
+
+        for attempt in range(10):
+            self.assertTrue(0 <= policy.delay(attempt) <= 8)
+
+    @patch("argo_probe_xml.retry.time.monotonic")
+    def test_remaining(self, mock_time):
+        mock_time.return_value = 1004.
+        self.assertIsNone(RetryPolicy().remaining(1000.))
+        self.assertEqual(RetryPolicy(deadline=10).remaining(1000.), 6.)
+
+    def test_hedge_delay(self):
+        self.assertIsNone(RetryPolicy().hedge_delay("mock.url.com"))
+        self.assertEqual(
+            RetryPolicy(hedge="0.5").hedge_delay("mock.url.com"), 0.5
+        )
+
+    def test_is_valid_hedge(self):
+        for spec in ["0", "0.5", "2", "p95", "p99.9"]:
+            self.assertTrue(is_valid_hedge(spec))
+
+        for spec in ["-1", "p101", "avg", "p", ""]:
+            self.assertFalse(is_valid_hedge(spec))
+
+
+class LatencyTests(unittest.TestCase):
+    def tearDown(self):
+        retry._latencies.clear()
+
+    def test_latency_percentile(self):
+        for i in range(retry.MIN_LATENCY_SAMPLES - 1):
+            record_latency("mock.url.com", i / 10)
+
+        self.assertIsNone(latency_percentile("mock.url.com", "p50"))
+        record_latency("mock.url.com", 1.9)
+        self.assertAlmostEqual(latency_percentile("mock.url.com", "p50"), 0.95)
+        self.assertEqual(latency_percentile("mock.url.com", "p100"), 1.9)
+        self.assertIsNone(latency_percentile("mock2.url.com", "p50"))
+        self.assertAlmostEqual(
+            RetryPolicy(hedge="p50").hedge_delay("mock.url.com"), 0.95
+        )
+
+    def test_keeps_last_samples(self):
+        for _ in range(retry.LATENCY_SAMPLES):
+            record_latency("mock.url.com", 5.)
+
+        for _ in range(retry.LATENCY_SAMPLES):
+            record_latency("mock.url.com", 1.)
+
+        self.assertEqual(latency_percentile("mock.url.com", "p100"), 1.)
+
+
+class HedgedTests(unittest.TestCase):
+    def test_fast_response(self):
+        calls = []
+
+        def request():
+            calls.append(1)
+            return MockResponse("first")
+
+        self.assertEqual(hedged(request, 1).name, "first")
+        self.assertEqual(len(calls), 1)
+
+    def test_slow_response(self):
+        release = threading.Event()
+        responses = [MockResponse("first"), MockResponse("second")]
+        calls = []
+
+        def request():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(5)
+                return responses[0]
+
+            return responses[1]
+
+        try:
+            self.assertIs(hedged(request, 0.05), responses[1])
+
+        finally:
+            release.set()
+
+        for _ in range(50):
+            if responses[0].closed:
+                break
+
+            time.sleep(0.01)
+
+        self.assertTrue(responses[0].closed)
+        self.assertFalse(responses[1].closed)
+
+    def test_first_request_fails(self):
+        calls = []
+
+        def request():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                raise OSError("Connection reset")
+
+            time.sleep(0.2)
+            return MockResponse("second")
+
+        self.assertEqual(hedged(request, 0.05).name, "second")
+
+    def test_all_requests_fail(self):
+        def request():
+            time.sleep(0.1)
+            raise OSError("Connection refused")
+
+        with self.assertRaises(OSError) as context:
+            hedged(request, 0.05)
+
+        self.assertEqual(context.exception.__str__(), "Connection refused")
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import argo_probe_xml
+
+CHECK_XML = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src", "check_xml"
+)
+
+# modules whose import takes a considerable part of the probe runtime
+HEAVY_MODULES = ["requests", "lxml.etree", "concurrent.futures", "aiohttp"]
+
+
+def import_times(args):
+    # runs the probe with -X importtime, and returns the cumulative import
+    # time in microseconds of each of the imported modules
+    env = dict(
+        (key, value) for key, value in os.environ.items()
+        if not key.lower().endswith("_proxy")
+    )
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(argo_probe_xml.__file__))] +
+        [item for item in [env.get("PYTHONPATH")] if item]
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", CHECK_XML] + args,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+        universal_newlines=True
+    )
+
+    times = dict()
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+
+    return times
+
+
+@unittest.skipUnless(os.path.exists(CHECK_XML), "check_xml is not available")
+@unittest.skipIf(sys.version_info < (3, 7), "-X importtime is not available")
+class StartupTests(unittest.TestCase):
+    def assertNotImported(self, times):
+        self.assertEqual(
+            [module for module in HEAVY_MODULES if module in times], []
+        )
+
+    def test_help(self):
+        times = import_times(["-h"])
+        self.assertIn("argo_probe_xml.daemon", times)
+        self.assertNotImported(times)
+
+    def test_invalid_arguments(self):
+        self.assertNotImported(import_times(["-x", "/root/test/path"]))
+        self.assertNotImported(import_times(["-u"]))
+
+    def test_check(self):
+        times = import_times(["-u", "http://127.0.0.1:1/", "-t", "1"])
+        self.assertIn("lxml.etree", times)
+        self.assertNotIn("requests", times)
@@ -0,0 +1,123 @@
+import importlib.util
+import math
+import unittest
+from unittest.mock import patch
+
+from argo_probe_xml.threshold import Threshold, classify, get_threshold, \
+    is_valid
+
+values = ["5", "4", "59", "15", "0", "0", "3"]
+
+
+class ThresholdTests(unittest.TestCase):
+    def test_parse(self):
+        threshold = Threshold("50")
+        self.assertEqual(
+            (threshold.lower, threshold.upper, threshold.negate),
+            (0, 50., False)
+        )
+        self.assertEqual(threshold.location, "outside")
+        self.assertEqual(threshold.rng, "[0, 50.0]")
+
+        threshold = Threshold(":50")
+        self.assertEqual((threshold.lower, threshold.upper), (-math.inf, 50.))
+        self.assertEqual(threshold.rng, "[-Inf, 50.0]")
+
+        threshold = Threshold("10:")
+        self.assertEqual((threshold.lower, threshold.upper), (10., math.inf))
+        self.assertEqual(threshold.rng, "[10.0, Inf]")
+
+        threshold = Threshold("@10:20")
+        self.assertEqual(
+            (threshold.lower, threshold.upper, threshold.negate),
+            (10., 20., True)
+        )
+        self.assertEqual(threshold.location, "inside")
+        self.assertEqual(threshold.rng, "[10.0, 20.0]")
+
+    def test_parse_invalid(self):
+        for spec in ["x50", "5@0:", "10:x", ""]:
+            with self.assertRaises(ValueError):
+                Threshold(spec)
+
+            self.assertFalse(is_valid(spec))
+
+        self.assertTrue(is_valid("@10:20"))
+
+    def test_get_threshold_memoized(self):
+        self.assertIs(get_threshold("10:20"), get_threshold("10:20"))
+        self.assertIsNot(get_threshold("10:20"), get_threshold("10:30"))
+
+    def test_fails(self):
+        self.assertTrue(Threshold("50").fails("59"))
+        self.assertFalse(Threshold("50").fails(50))
+        self.assertTrue(Threshold("@10:20").fails("15"))
+        self.assertFalse(Threshold("@10:20").fails("25"))
+        with self.assertRaises(ValueError):
+            Threshold("50").fails("test")
+
+    def test_failing(self):
+        self.assertEqual(Threshold("50").failing(values), [2])
+        self.assertEqual(
+            Threshold("10:").failing(values), [0, 1, 4, 5, 6]
+        )
+        self.assertEqual(Threshold("@10:50").failing(values), [3])
+
+
+class ClassifyTests(unittest.TestCase):
+    def test_classify(self):
+        self.assertEqual(
+            classify(
+                values, critical=Threshold("0:50"), warning=Threshold("0:10")
+            ),
+            (
+                {"critical": [2], "warning": [3]},
+                {"count": 7, "min": 0., "max": 59.}
+            )
+        )
+        self.assertEqual(
+            classify(values, warning=Threshold("@1:10")),
+            ({"warning": [0, 1, 6]}, {"count": 7, "min": 0., "max": 59.})
+        )
+        self.assertEqual(
+            classify(["60"], critical=Threshold("10:")),
+            ({"critical": []}, {"count": 1, "min": 60., "max": 60.})
+        )
+
+    def test_classify_nan(self):
+        with self.assertRaises(ValueError):
+            classify(["1", "test"], critical=Threshold("50"))
+
+    @unittest.skipIf(
+        importlib.util.find_spec("numpy") is None, "numpy is not installed"
+    )
+    @patch("argo_probe_xml.threshold.NUMPY_MIN_SIZE", 1)
+    def test_classify_numpy(self):
+        self.assertEqual(
+            classify(
+                values, critical=Threshold("0:50"), warning=Threshold("0:10")
+            ),
+            (
+                {"critical": [2], "warning": [3]},
+                {"count": 7, "min": 0., "max": 59.}
+            )
+        )
+        self.assertEqual(Threshold("@10:50").failing(values), [3])
+        with self.assertRaises(ValueError):
+            classify(["1", "test"], critical=Threshold("50"))
+
+    @unittest.skipIf(
+        importlib.util.find_spec("numpy") is None, "numpy is not installed"
+    )
+    def test_classify_same_with_numpy(self):
+        for items in [["1", "nan", "60"], ["nan"]]:
+            expected = classify(items, critical=Threshold("50"))
+            with patch("argo_probe_xml.threshold.NUMPY_MIN_SIZE", 1):
+                self.assertEqual(
+                    classify(items, critical=Threshold("50")), expected
+                )
+
+        for size in [1, 1000]:
+            with patch("argo_probe_xml.threshold.NUMPY_MIN_SIZE", size):
+                with self.assertRaises(TypeError):
+                    classify(["1", None], critical=Threshold("50"))
@@ -0,0 +1,68 @@
+import datetime
+import unittest
+
+from argo_probe_xml.timestamp import ages, get_parser
+
+now = datetime.datetime(2022, 8, 12, 9, 30, 0, 250000)
+
+
+def old_age(item, time_format):
+    if time_format == "UNIX":
+        dt = now - datetime.datetime.utcfromtimestamp(int(item))
+
+    else:
+        dt = now - datetime.datetime.strptime(item, time_format)
+
+    return dt.seconds / 3600.
+
+
+class TimestampTests(unittest.TestCase):
+    def test_ages_unix(self):
+        values = [
+            "1660199401", "1660198775", "1660296600", "1660296601",
+            "1660296599", "1560296600", "0"
+        ]
+        self.assertEqual(
+            ages(values, "UNIX", now),
+            [old_age(item, "UNIX") for item in values]
+        )
+
+    def test_ages_iso_formats(self):
+        for time_format, values in [
+            ("%Y-%m-%d %H:%M:%S", [
+                "2022-08-11 08:19:34", "2022-08-12 09:30:01", "2022-8-11 1:2:3"
+            ]),
+            ("%Y-%m-%dT%H:%M:%S", ["2022-08-11T08:19:34"]),
+            ("%Y-%m-%d", ["2022-08-11", "2022-8-1"]),
+            ("%d.%m.%Y. %H:%M", ["11.08.2022. 08:19"])
+        ]:
+            self.assertEqual(
+                ages(values, time_format, now),
+                [old_age(item, time_format) for item in values]
+            )
+
+    def test_ages_invalid(self):
+        with self.assertRaises(ValueError):
+            ages(["2022-08-11 08:19:34.123"], "%Y-%m-%d %H:%M:%S", now)
+
+        with self.assertRaises(ValueError):
+            ages(["2022-13-11 08:19:34"], "%Y-%m-%d %H:%M:%S", now)
+
+        with self.assertRaises(ValueError):
+            ages(["2022-08-11"], "UNIX", now)
+
+    def test_ages_iso(self):
+        self.assertEqual(
+            ages(
+                [
+                    "2022-08-12T08:30:00.250000",
+                    "2022-08-12T10:30:00.25+02:00",
+                    "2022-08-12T07:30:00.25Z"
+                ], "ISO", now
+            ), [1., 1., 2.]
+        )
+
+    def test_get_parser_cached(self):
+        self.assertIs(
+            get_parser("%Y-%m-%d %H:%M:%S"), get_parser("%Y-%m-%d %H:%M:%S")
+        )
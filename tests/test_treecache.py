@@ -0,0 +1,159 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from argo_probe_xml.exceptions import CriticalException
+from argo_probe_xml.treecache import NODE_SIZE, TreeCache, estimate_size
+from lxml import etree
+
+xml = b"<aris><lastUpdate>1659507301</lastUpdate></aris>"
+
+
+def loader(calls, size=len(xml)):
+    def load():
+        calls.append(1)
+        return etree.fromstring(xml).getroottree(), size
+
+    return load
+
+
+class TreeCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = TreeCache()
+
+    def test_estimate_size(self):
+        tree = etree.fromstring(xml).getroottree()
+        self.assertEqual(estimate_size(tree, 100), 100 + 3 * NODE_SIZE)
+
+    @patch("argo_probe_xml.treecache.time.monotonic")
+    def test_get_reuses_tree(self, mock_time):
+        mock_time.return_value = 1000.
+        calls = []
+        tree = self.cache.get("mock", loader(calls), max_age=60)
+        mock_time.return_value = 1060.
+        self.assertIs(self.cache.get("mock", loader(calls), max_age=60), tree)
+        self.assertEqual(len(calls), 1)
+
+        mock_time.return_value = 1061.
+        self.assertIsNot(
+            self.cache.get("mock", loader(calls), max_age=60), tree
+        )
+        self.assertEqual(len(calls), 2)
+
+    def test_get_without_max_age(self):
+        calls = []
+        tree = self.cache.get("mock", loader(calls), max_age=0)
+        self.assertIsNot(self.cache.get("mock", loader(calls)), tree)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_get_other_version(self):
+        calls = []
+        tree = self.cache.get("mock", loader(calls), version=1)
+        self.assertIs(self.cache.get("mock", loader(calls), version=1), tree)
+        self.assertIsNot(
+            self.cache.get("mock", loader(calls), version=2), tree
+        )
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_evicts_least_recently_used(self):
+        size = len(xml) + 3 * NODE_SIZE
+        cache = TreeCache(max_size=2 * size)
+        calls = []
+        tree1 = cache.get("mock1", loader(calls))
+        cache.get("mock2", loader(calls))
+        cache.get("mock1", loader(calls))
+        cache.get("mock3", loader(calls))
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(cache.size, 2 * size)
+        self.assertIs(cache.get("mock1", loader(calls)), tree1)
+        cache.get("mock2", loader(calls))
+        self.assertEqual(len(calls), 4)
+
+    def test_does_not_store_too_large_tree(self):
+        cache = TreeCache(max_size=1000)
+        cache.get("mock", loader([], size=1000))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size, 0)
+
+    def test_single_flight(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def load():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return etree.fromstring(xml).getroottree(), len(xml)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            first = executor.submit(self.cache.get, "mock", load, max_age=0)
+            started.wait(5)
+            others = [
+                executor.submit(self.cache.get, "mock", load, max_age=0)
+                for _ in range(3)
+            ]
+            time.sleep(0.2)
+            release.set()
+            trees = [first.result()] + [other.result() for other in others]
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(tree is trees[0] for tree in trees))
+
+    def test_single_flight_error(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def load():
+            started.set()
+            release.wait(5)
+            raise CriticalException("500 Server Error")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(self.cache.get, "mock", load)
+            started.wait(5)
+            second = executor.submit(self.cache.get, "mock", load)
+            time.sleep(0.2)
+            release.set()
+            for future in [first, second]:
+                with self.assertRaises(CriticalException) as context:
+                    future.result()
+
+                self.assertEqual(
+                    context.exception.__str__(), "500 Server Error"
+                )
+
+        self.assertEqual(len(self.cache), 0)
+        calls = []
+        self.cache.get("mock", loader(calls))
+        self.assertEqual(len(calls), 1)
+
+    def test_single_flight_other_flight_key(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def failing_load():
+            started.set()
+            release.wait(5)
+            raise CriticalException("Read timed out")
+
+        calls = []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(
+                self.cache.get, "mock", failing_load, flight_key=(1,)
+            )
+            started.wait(5)
+            second = executor.submit(
+                self.cache.get, "mock", loader(calls), flight_key=(60,)
+            )
+            tree = second.result(5)
+            release.set()
+            with self.assertRaises(CriticalException):
+                first.result()
+
+        self.assertEqual(len(calls), 1)
+        self.assertIs(self.cache.get("mock", loader(calls)), tree)
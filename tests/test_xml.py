@@ -1,10 +1,21 @@
 import datetime
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 from unittest.mock import patch, call
 
+import requests
 import requests.exceptions
 from argo_probe_xml.exceptions import WarningException, CriticalException
-from argo_probe_xml.xml import XML
+from argo_probe_xml import xml as xml_module
+from argo_probe_xml.cache import ResponseCache
+from argo_probe_xml.retry import RetryPolicy
+from argo_probe_xml.xml import XML, compile_xpath
+from lxml import etree
 
 xml1 = b"<aris>" \
          b"<lastUpdate>1659507301</lastUpdate>" \
@@ -130,13 +141,29 @@ xml3 = b"<aris>" \
 
 
 class MockResponse:
-    def __init__(self, data, status_code):
+    def __init__(self, data, status_code, headers=None):
         self.content = data
         self.status_code = status_code
+        self.headers = headers if headers else {}
         self.reason = "BAD REQUEST"
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def close(self):
+        self.closed = True
 
     def raise_for_status(self):
-        if not str(self.status_code).startswith("2"):
+        if not str(self.status_code).startswith("2") and \
+                self.status_code != 304:
             raise requests.exceptions.HTTPError(
                 f"{self.status_code} {self.reason}"
             )
@@ -150,6 +177,808 @@ def mock_response_500(*args, **kwargs):
     return MockResponse(None, status_code=500)
 
 
+class XPathCacheTests(unittest.TestCase):
+    def setUp(self):
+        xml_module._xpath_cache.clear()
+
+    def tearDown(self):
+        xml_module._xpath_cache.clear()
+
+    def test_compile_xpath_reuses_evaluator(self):
+        evaluator = compile_xpath("/aris/lastUpdate")
+        self.assertIs(compile_xpath("/aris/lastUpdate"), evaluator)
+        self.assertIsNot(
+            compile_xpath("/aris/lastUpdate", namespaces={"a": "urn:a"}),
+            evaluator
+        )
+        self.assertEqual(len(xml_module._xpath_cache), 2)
+
+    @patch("argo_probe_xml.xml.XPATH_CACHE_SIZE", 2)
+    def test_compile_xpath_evicts_least_recently_used(self):
+        evaluator1 = compile_xpath("/mock/path1")
+        compile_xpath("/mock/path2")
+        compile_xpath("/mock/path1")
+        compile_xpath("/mock/path3")
+        self.assertEqual(
+            list(key[0] for key in xml_module._xpath_cache),
+            ["/mock/path1", "/mock/path3"]
+        )
+        self.assertIs(compile_xpath("/mock/path1"), evaluator1)
+
+
+class XMLThresholdsTests(unittest.TestCase):
+    @patch("argo_probe_xml.xml.XML.parse")
+    def test_thresholds(self, mock_parse):
+        mock_parse.return_value = ["5", "4", "59", "15", "0", "0", "3"]
+        xml = XML("https://mock1.url.com")
+        self.assertEqual(
+            xml.thresholds(
+                xpath="/aris/partition/running_jobs", warning="60",
+                critical="100"
+            ), "OK"
+        )
+
+        with self.assertRaises(CriticalException) as context1:
+            xml.thresholds(
+                xpath="/aris/partition/running_jobs", warning="10",
+                critical="50"
+            )
+
+        with self.assertRaises(WarningException) as context2:
+            xml.thresholds(
+                xpath="/aris/partition/running_jobs", warning="10",
+                critical="60"
+            )
+
+        with self.assertRaises(CriticalException) as context3:
+            xml.thresholds(
+                xpath="/aris/partition/running_jobs", warning="x10",
+                critical="60"
+            )
+
+        self.assertEqual(mock_parse.call_count, 3)
+        self.assertEqual(
+            context1.exception.__str__(),
+            "/aris/partition/running_jobs: Partition 2 value outside "
+            "range [0, 50.0]"
+        )
+        self.assertEqual(
+            context2.exception.__str__(),
+            "/aris/partition/running_jobs: Partitions 2, 3 values outside "
+            "range [0, 10.0]"
+        )
+        self.assertEqual(
+            context3.exception.__str__(),
+            "/aris/partition/running_jobs: Invalid format of warning threshold"
+        )
+        self.assertEqual(
+            xml.stats["/aris/partition/running_jobs"], {
+                "count": 7, "min": 0., "max": 59., "critical": 0,
+                "warning": 2
+            }
+        )
+
+    @patch("argo_probe_xml.xml.XML.parse")
+    def test_threshold_stats(self, mock_parse):
+        mock_parse.return_value = [5, 4, 59, 15, 0, 0, 3]
+        xml = XML("https://mock1.url.com")
+        self.assertEqual(
+            xml.critical(xpath="/aris/partition/running_jobs", threshold="60"),
+            "OK"
+        )
+        with self.assertRaises(WarningException):
+            xml.warning(xpath="/aris/partition/running_jobs", threshold="10")
+
+        self.assertEqual(
+            xml.stats, {
+                "/aris/partition/running_jobs": {
+                    "count": 7, "min": 0., "max": 59., "critical": 0,
+                    "warning": 2
+                }
+            }
+        )
+
+
+class XMLAggregateTests(unittest.TestCase):
+    def setUp(self):
+        self.xml = XML("https://mock1.url.com")
+
+    @patch("argo_probe_xml.xml.XML.parse")
+    def test_thresholds_aggregate(self, mock_parse):
+        mock_parse.return_value = ["5", "4", "59", "15", "0", "0", "3"]
+        self.assertEqual(
+            self.xml.thresholds(
+                xpath="/aris/partition/running_jobs", critical="100",
+                aggregate="sum"
+            ), "OK"
+        )
+        with self.assertRaises(WarningException) as context1:
+            self.xml.thresholds(
+                xpath="/aris/partition/running_jobs", warning="40",
+                critical="100", aggregate="p95"
+            )
+
+        with self.assertRaises(CriticalException) as context2:
+            self.xml.thresholds(
+                xpath="/aris/partition/running_jobs", critical="@10:20",
+                aggregate="avg"
+            )
+
+        self.assertEqual(
+            context1.exception.__str__(),
+            "/aris/partition/running_jobs: P95 value 45.8 outside range "
+            "[0, 40.0]"
+        )
+        self.assertEqual(
+            context2.exception.__str__(),
+            "/aris/partition/running_jobs: Avg value 12.2857142857 inside "
+            "range [10.0, 20.0]"
+        )
+        self.assertEqual(
+            self.xml.stats, {
+                "/aris/partition/running_jobs": {
+                    "count": 1, "min": 86 / 7, "max": 86 / 7, "critical": 1,
+                    "warning": 1, "aggregate": "avg"
+                }
+            }
+        )
+
+    @patch("argo_probe_xml.xml.XML.parse")
+    def test_thresholds_aggregate_not_numbers(self, mock_parse):
+        mock_parse.return_value = ["5", "up"]
+        with self.assertRaises(CriticalException) as context:
+            self.xml.thresholds(
+                xpath="/aris/partition/state_up", critical="10",
+                aggregate="sum"
+            )
+
+        self.assertEqual(
+            context.exception.__str__(),
+            "/aris/partition/state_up: Node values are not numbers"
+        )
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_parse_xpath_functions(self, mock_get):
+        mock_get.return_value = xml1
+        self.assertEqual(
+            self.xml.parse("sum(/aris/partition/running_jobs)"), "72"
+        )
+        self.assertEqual(self.xml.parse("count(/aris/partition)"), "7")
+        self.assertEqual(self.xml.parse("count(/aris/partition) > 5"), "true")
+        self.assertEqual(self.xml.parse("boolean(/aris/missing)"), "false")
+        self.assertEqual(
+            self.xml.parse("string(/aris/partition/name)"), "compute"
+        )
+        self.assertEqual(
+            self.xml.parse("/aris/partition[1]/name/text()"), "compute"
+        )
+        mock_get.assert_called_once()
+
+    def test_xpath_values(self):
+        tree = etree.fromstring(
+            b"<aris><partition name='cpu'>59</partition></aris>"
+        )
+        self.assertEqual(
+            xml_module.xpath_values(tree.xpath("//@name")), ["cpu"]
+        )
+        self.assertEqual(
+            xml_module.xpath_values(tree.xpath("//partition")), ["59"]
+        )
+        self.assertEqual(xml_module.xpath_values(0.1 + 0.2), ["0.3"])
+        self.assertEqual(xml_module.xpath_values(float("nan")), ["nan"])
+        self.assertEqual(xml_module.xpath_values(True), ["true"])
+
+
+def chunks(data, size=17, consumed=None):
+    for i in range(0, len(data), size):
+        if consumed is not None:
+            consumed.append(i)
+
+        yield data[i:i + size]
+
+
+class XMLStreamTests(unittest.TestCase):
+    def setUp(self):
+        self.xml = XML(
+            "https://mock1.url.com", stream=True,
+            xpaths=["/aris/lastUpdate", "/aris/partition/running_jobs"]
+        )
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    def test_parse(self, mock_get):
+        mock_get.return_value = chunks(xml1)
+        self.assertEqual(self.xml.parse("/aris/lastUpdate"), "1659507301")
+        self.assertEqual(
+            self.xml.parse("/aris/partition/running_jobs"),
+            ["59", "4", "5", "1", "0", "0", "3"]
+        )
+        self.assertTrue(self.xml.parse())
+        mock_get.assert_called_once()
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    def test_parse_unregistered_xpath(self, mock_get):
+        mock_get.side_effect = [chunks(xml1), chunks(xml1)]
+        self.assertEqual(self.xml.parse("/aris/lastUpdate"), "1659507301")
+        self.assertEqual(
+            self.xml.parse("/aris/partition/state_up"),
+            ["up", "up", "up", "up", "up", "up", "up"]
+        )
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    def test_parse_if_missing_element(self, mock_get):
+        mock_get.return_value = chunks(xml1)
+        with self.assertRaises(CriticalException) as context:
+            self.xml.parse("/aris/nonexisting")
+
+        self.assertEqual(
+            context.exception.__str__(),
+            "Unable to find element with XPath /aris/nonexisting"
+        )
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    def test_parse_if_wrong_format(self, mock_get):
+        mock_get.return_value = chunks(xml3)
+        with self.assertRaises(CriticalException) as context:
+            self.xml.parse()
+
+        self.assertIn("Unable to parse xml", context.exception.__str__())
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    def test_parse_complex_xpath(self, mock_get):
+        mock_get.return_value = chunks(xml1)
+        with self.assertRaises(ValueError):
+            self.xml.parse("/aris/partition[1]/name")
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    def test_parse_partial(self, mock_get):
+        consumed = []
+        mock_get.return_value = chunks(xml1, size=64, consumed=consumed)
+        xml = XML(
+            "https://mock1.url.com", partial=True,
+            xpaths=["/aris/lastUpdate", "/aris/partition/running_jobs"]
+        )
+        self.assertTrue(xml.stream)
+        self.assertEqual(xml.parse("/aris/lastUpdate"), "1659507301")
+        self.assertEqual(xml.parse("/aris/partition/running_jobs"), "59")
+        self.assertEqual(consumed, [0, 64])
+        self.assertEqual(mock_get.return_value.gi_frame, None)
+        mock_get.assert_called_once()
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    def test_parse_partial_missing_element(self, mock_get):
+        mock_get.return_value = chunks(xml1)
+        xml = XML("https://mock1.url.com", partial=True)
+        with self.assertRaises(CriticalException) as context:
+            xml.parse("/aris/nonexisting")
+
+        self.assertEqual(
+            context.exception.__str__(),
+            "Unable to find element with XPath /aris/nonexisting"
+        )
+
+    def test_processed_subtrees_are_discarded(self):
+        parser = etree.XMLPullParser(events=("end",))
+        values = {"/aris/partition/name": []}
+        parser.feed(xml1)
+        XML._collect(
+            parser, {("name", "partition", "aris"): "/aris/partition/name"},
+            values
+        )
+        root = parser.close()
+        self.assertEqual(len(root), 0)
+        self.assertEqual(
+            values["/aris/partition/name"],
+            ["compute", "gpu", "fat", "taskp", "viz", "short", "ml"]
+        )
+
+
+class XMLIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.xml = XML(
+            "https://mock1.url.com", xpaths=[
+                "/aris/lastUpdate", "/aris/partition/running_jobs",
+                "/aris/partition/name", "/aris/partition[2]/name",
+                "/aris/nonexisting/name"
+            ]
+        )
+
+    @patch("argo_probe_xml.xml.compile_xpath", wraps=compile_xpath)
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_parse_simple_xpaths(self, mock_get, mock_compile):
+        mock_get.return_value = xml1
+        self.assertEqual(self.xml.parse("/aris/lastUpdate"), "1659507301")
+        self.assertEqual(
+            self.xml.parse("/aris/partition/running_jobs"),
+            ["59", "4", "5", "1", "0", "0", "3"]
+        )
+        self.assertEqual(
+            self.xml.parse("/aris/partition/name"),
+            ["compute", "gpu", "fat", "taskp", "viz", "short", "ml"]
+        )
+        with self.assertRaises(CriticalException) as context:
+            self.xml.parse("/aris/nonexisting/name")
+
+        self.assertEqual(
+            context.exception.__str__(),
+            "Unable to find element with XPath /aris/nonexisting/name"
+        )
+        mock_compile.assert_not_called()
+
+    @patch("argo_probe_xml.xml.compile_xpath", wraps=compile_xpath)
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_parse_complex_xpaths(self, mock_get, mock_compile):
+        mock_get.return_value = xml1
+        self.assertEqual(self.xml.parse("/aris/partition[2]/name"), "gpu")
+        self.assertEqual(self.xml.parse("//state_up")[:2], ["up", "up"])
+        self.assertEqual(mock_compile.call_count, 2)
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_index_matches_xpath(self, mock_get):
+        mock_get.return_value = xml2
+        xpaths = [
+            "/OAI-PMH/Identify/adminEmail", "/OAI-PMH/responseDate",
+            "/OAI-PMH/request", "/OAI-PMH/Identify/baseURL"
+        ]
+        xml = XML("https://mock2.url.com", xpaths=xpaths)
+        for xpath in xpaths:
+            self.assertEqual(
+                xml.parse(xpath), XML("https://mock2.url.com").parse(xpath)
+            )
+
+
+class XMLParserTests(unittest.TestCase):
+    def test_get_parser_reused_per_thread(self):
+        options = xml_module.parser_options()
+        parser = xml_module.get_parser(options)
+        self.assertIs(xml_module.get_parser(options), parser)
+        self.assertIsNot(
+            xml_module.get_parser(
+                xml_module.parser_options(remove_blank_text=True)
+            ), parser
+        )
+
+        parsers = []
+        thread = threading.Thread(
+            target=lambda: parsers.append(xml_module.get_parser(options))
+        )
+        thread.start()
+        thread.join()
+        self.assertIsNot(parsers[0], parser)
+
+    def test_entities(self):
+        data = b"<!DOCTYPE aris [<!ENTITY v \"5\">]>" \
+               b"<aris><lastUpdate>&v;</lastUpdate></aris>"
+        expanded = "5" if etree.LXML_VERSION >= (5,) else None
+        for stream in [False, True]:
+            for kwargs, value in [
+                ({}, expanded), ({"huge_tree": True}, None),
+                ({"no_entities": True}, None)
+            ]:
+                xml = XML(
+                    "https://mock1.url.com", stream=stream,
+                    xpaths=["/aris/lastUpdate"], **kwargs
+                )
+                with patch(
+                        "argo_probe_xml.xml.XML._iter_get",
+                        return_value=chunks(data)
+                ), patch("argo_probe_xml.xml.XML._get", return_value=data):
+                    self.assertEqual(xml.parse("/aris/lastUpdate"), value)
+
+    def test_external_entities_not_loaded(self):
+        self.assertNotEqual(
+            xml_module.parser_options()["resolve_entities"], True
+        )
+        with tempfile.NamedTemporaryFile("wb", delete=False) as f:
+            f.write(b"secret")
+
+        data = f"<!DOCTYPE aris [<!ENTITY e SYSTEM \"file://{f.name}\">]>" \
+               f"<aris><lastUpdate>&e;</lastUpdate></aris>".encode("utf-8")
+
+        try:
+            for stream in [False, True]:
+                for kwargs in [{}, {"huge_tree": True}, {"no_entities": True}]:
+                    xml = XML(
+                        "https://mock1.url.com", stream=stream,
+                        xpaths=["/aris/lastUpdate"], **kwargs
+                    )
+                    with patch(
+                            "argo_probe_xml.xml.XML._iter_get",
+                            return_value=chunks(data)
+                    ), patch(
+                        "argo_probe_xml.xml.XML._get", return_value=data
+                    ):
+                        try:
+                            value = xml.parse("/aris/lastUpdate")
+
+                        except CriticalException:
+                            value = None
+
+                        self.assertIsNone(value)
+
+        finally:
+            os.remove(f.name)
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_huge_tree(self, mock_get):
+        data = b"<aris>" * 300 + b"</aris>" * 300
+        mock_get.return_value = data
+        with self.assertRaises(CriticalException) as context:
+            XML("https://mock1.url.com").parse()
+
+        self.assertIn("Unable to parse xml", context.exception.__str__())
+        self.assertTrue(XML("https://mock1.url.com", huge_tree=True).parse())
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_remove_blank_text(self, mock_get):
+        mock_get.return_value = \
+            b"<aris>\n  <lastUpdate>1659507301</lastUpdate>" \
+            b"\n  <name> </name>\n</aris>"
+        xml = XML("https://mock1.url.com", xpaths=["/aris", "/aris/name"])
+        self.assertEqual(xml.parse("/aris"), "\n  ")
+        xml = XML(
+            "https://mock1.url.com", xpaths=["/aris", "/aris/name"],
+            remove_blank_text=True
+        )
+        self.assertIsNone(xml.parse("/aris"))
+        self.assertEqual(xml.parse("/aris/name"), " ")
+        self.assertEqual(xml.parse("/aris/lastUpdate"), "1659507301")
+
+
+glue = b"<glue:Domains xmlns:glue='http://glue2' xmlns:ext='urn:ext'>" \
+       b"<glue:AdminDomain><glue:ID>site1</glue:ID>" \
+       b"<glue:RunningJobs>5</glue:RunningJobs></glue:AdminDomain>" \
+       b"<glue:AdminDomain><glue:ID>site2</glue:ID>" \
+       b"<glue:RunningJobs>7</glue:RunningJobs><ext:Load>2</ext:Load>" \
+       b"</glue:AdminDomain>" \
+       b"</glue:Domains>"
+
+atom = b"<feed xmlns='http://www.w3.org/2005/Atom'>" \
+       b"<updated>2022-08-03T06:15:01Z</updated></feed>"
+
+
+class XMLNamespaceTests(unittest.TestCase):
+    def test_get_namespaces(self):
+        self.assertEqual(
+            xml_module.get_namespaces(
+                ["a=http://www.w3.org/2005/Atom", "g=urn:a=b"]
+            ), {"a": "http://www.w3.org/2005/Atom", "g": "urn:a=b"}
+        )
+        self.assertEqual(xml_module.get_namespaces(None), {})
+        for item in ["a", "=urn:a", "a=", "1a=urn:a"]:
+            with self.assertRaises(ValueError) as context:
+                xml_module.get_namespaces([item])
+
+            self.assertEqual(
+                context.exception.__str__(),
+                f"Invalid namespace {item}: must be given as prefix=uri"
+            )
+
+    def test_is_simple_xpath(self):
+        self.assertTrue(xml_module.is_simple_xpath("/glue:Domains/ext:Load"))
+        self.assertTrue(xml_module.is_simple_xpath("/glue:Domains/name"))
+        self.assertFalse(xml_module.is_simple_xpath("/glue:/name"))
+        self.assertFalse(xml_module.is_simple_xpath("/a:b:c"))
+
+    def test_expand_steps(self):
+        self.assertEqual(
+            xml_module.expand_steps(
+                "/glue:Domains/name", {"glue": "http://glue2"}
+            ), ["{http://glue2}Domains", "name"]
+        )
+        with self.assertRaises(ValueError) as context:
+            xml_module.expand_steps("/glue:Domains", {})
+
+        self.assertEqual(
+            context.exception.__str__(),
+            "Undefined namespace prefix glue in XPath /glue:Domains"
+        )
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_parse_discovered_namespaces(self, mock_get, mock_iter_get):
+        xpaths = [
+            "/glue:Domains/glue:AdminDomain/glue:ID",
+            "/glue:Domains/glue:AdminDomain/ext:Load"
+        ]
+        mock_get.return_value = glue
+        for stream in [False, True]:
+            mock_iter_get.return_value = chunks(glue)
+            xml = XML("https://mock1.url.com", xpaths=xpaths, stream=stream)
+            self.assertEqual(xml.parse(xpaths[0]), ["site1", "site2"])
+            self.assertEqual(xml.parse(xpaths[1]), "2")
+
+        xml = XML("https://mock1.url.com")
+        self.assertEqual(
+            xml.parse("sum(//glue:RunningJobs) + count(//ext:Load)"), "13"
+        )
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_parse_explicit_namespaces(self, mock_get, mock_iter_get):
+        mock_get.return_value = atom
+        namespaces = {"a": "http://www.w3.org/2005/Atom"}
+        for stream in [False, True]:
+            mock_iter_get.return_value = chunks(atom)
+            xml = XML(
+                "https://mock1.url.com", xpaths=["/a:feed/a:updated"],
+                stream=stream, namespaces=namespaces
+            )
+            self.assertEqual(
+                xml.parse("/a:feed/a:updated"), "2022-08-03T06:15:01Z"
+            )
+
+        mock_get.return_value = glue
+        xml = XML(
+            "https://mock1.url.com", namespaces={"glue": "urn:other"},
+            xpaths=["/glue:Domains", "/g:Domains/g:AdminDomain/g:ID"]
+        )
+        with self.assertRaises(CriticalException):
+            xml.parse("/glue:Domains")
+
+        with self.assertRaises(etree.XPathEvalError):
+            xml.parse("/g:Domains/g:AdminDomain/g:ID")
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    def test_parse_stream_undefined_prefix(self, mock_get):
+        mock_get.return_value = chunks(glue)
+        xml = XML("https://mock1.url.com", xpaths=["/g:Domains"], stream=True)
+        with self.assertRaises(ValueError) as context:
+            xml.parse("/g:Domains")
+
+        self.assertEqual(
+            context.exception.__str__(),
+            "Undefined namespace prefix g in XPath /g:Domains"
+        )
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_parse_prefix_of_nested_element(self, mock_get, mock_iter_get):
+        # only the namespaces of the root element are used in both modes
+        data = b"<root><a xmlns:q='urn:q'><q:v>1</q:v></a></root>"
+        mock_get.return_value = data
+        mock_iter_get.return_value = chunks(data)
+        with self.assertRaises(etree.XPathEvalError):
+            XML("https://mock1.url.com").parse("/root/a/q:v")
+
+        xml = XML(
+            "https://mock1.url.com", xpaths=["/root/a/q:v"], stream=True
+        )
+        with self.assertRaises(ValueError):
+            xml.parse("/root/a/q:v")
+
+
+class XMLRetryTests(unittest.TestCase):
+    @patch("argo_probe_xml.xml.time.sleep")
+    @patch("requests.Session.get")
+    def test_retry_server_error(self, mock_get, mock_sleep):
+        failed = MockResponse(None, status_code=503)
+        mock_get.side_effect = [failed, MockResponse(xml1, status_code=200)]
+        xml = XML("https://mock1.url.com", retry=RetryPolicy(retries=2))
+        self.assertEqual(xml._get(), xml1)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertTrue(failed.closed)
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertLessEqual(mock_sleep.call_args[0][0], 0.5)
+
+    @patch("argo_probe_xml.xml.time.sleep")
+    @patch("requests.Session.get")
+    def test_retry_connection_error(self, mock_get, mock_sleep):
+        mock_get.side_effect = requests.exceptions.ConnectionError(
+            "Connection refused"
+        )
+        xml = XML("https://mock1.url.com", retry=RetryPolicy(retries=2))
+        with self.assertRaises(CriticalException) as context:
+            xml._get()
+
+        self.assertEqual(context.exception.__str__(), "Connection refused")
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch("argo_probe_xml.xml.time.sleep")
+    @patch("requests.Session.get")
+    def test_retries_exhausted(self, mock_get, mock_sleep):
+        mock_get.side_effect = mock_response_500
+        xml = XML("https://mock1.url.com", retry=RetryPolicy(retries=1))
+        with self.assertRaises(CriticalException) as context:
+            xml._get()
+
+        self.assertEqual(context.exception.__str__(), "500 BAD REQUEST")
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch("requests.Session.get")
+    def test_no_retry_client_error(self, mock_get):
+        mock_get.side_effect = lambda *args, **kwargs: MockResponse(
+            None, status_code=404
+        )
+        xml = XML("https://mock1.url.com", retry=RetryPolicy(retries=2))
+        with self.assertRaises(CriticalException):
+            xml._get()
+
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch("argo_probe_xml.xml.time.sleep")
+    @patch("argo_probe_xml.xml.time.monotonic")
+    @patch("requests.Session.get")
+    def test_retry_within_deadline(self, mock_get, mock_time, mock_sleep):
+        mock_time.side_effect = [1000., 1009.9, 1009.9]
+        mock_get.side_effect = mock_response_500
+        xml = XML(
+            "https://mock1.url.com", connect_timeout=5,
+            retry=RetryPolicy(retries=3, deadline=10)
+        )
+        with patch("argo_probe_xml.retry.random.uniform", return_value=0.2):
+            with self.assertRaises(CriticalException):
+                xml._get()
+
+        # there is no time left for the backoff, so the request is not retried
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_sleep.call_count, 0)
+        connect, read = mock_get.call_args[1]["timeout"]
+        self.assertAlmostEqual(connect, 0.1)
+        self.assertAlmostEqual(read, 0.1)
+
+    @patch("requests.Session.get")
+    def test_timeouts(self, mock_get):
+        mock_get.side_effect = mock_response_ok
+        XML("https://mock1.url.com", timeout=30)._get()
+        self.assertEqual(mock_get.call_args[1]["timeout"], 30)
+        XML("https://mock1.url.com", timeout=30, connect_timeout=5)._get()
+        self.assertEqual(mock_get.call_args[1]["timeout"], (5, 30))
+
+    @patch("argo_probe_xml.xml.time.monotonic")
+    @patch("requests.Session.get")
+    def test_deadline_exceeded_while_reading(self, mock_get, mock_time):
+        mock_time.side_effect = [1000., 1001., 1005., 1011.]
+        mock_get.side_effect = mock_response_ok
+        xml = XML(
+            "https://mock1.url.com", retry=RetryPolicy(deadline=10)
+        )
+        with patch("argo_probe_xml.xml.STREAM_CHUNK_SIZE", len(xml1) // 2):
+            with self.assertRaises(CriticalException) as context:
+                xml._get()
+
+        self.assertEqual(
+            context.exception.__str__(),
+            "https://mock1.url.com: Deadline of 10 s exceeded"
+        )
+
+    @patch("requests.Session.get")
+    def test_hedged_request(self, mock_get):
+        slow = MockResponse(xml1, status_code=200)
+        fast = MockResponse(xml1, status_code=200)
+        release = threading.Event()
+
+        def get(*args, **kwargs):
+            if mock_get.call_count == 1:
+                release.wait(5)
+                return slow
+
+            return fast
+
+        mock_get.side_effect = get
+        xml = XML(
+            "https://mock1.url.com", retry=RetryPolicy(hedge="0.05")
+        )
+        try:
+            self.assertEqual(xml._get(), xml1)
+
+        finally:
+            release.set()
+
+        self.assertEqual(mock_get.call_count, 2)
+        for _ in range(50):
+            if slow.closed:
+                break
+
+            time.sleep(0.01)
+
+        self.assertTrue(slow.closed)
+        self.assertFalse(fast.closed)
+
+
+class XMLFileTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, "status.xml")
+        with open(self.path, "wb") as f:
+            f.write(xml1)
+
+        xml_module._tree_cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        xml_module._tree_cache.clear()
+
+    def test_get_path(self):
+        self.assertEqual(xml_module.get_path("/tmp/a.xml"), "/tmp/a.xml")
+        self.assertEqual(xml_module.get_path("a.xml"), "a.xml")
+        self.assertEqual(
+            xml_module.get_path("file:///tmp/a%20b.xml"), "/tmp/a b.xml"
+        )
+        self.assertIsNone(xml_module.get_path("https://mock.url.com/a.xml"))
+
+    @patch("argo_probe_xml.xml.XML._iter_get")
+    def test_parse(self, mock_get):
+        for url in [self.path, f"file://{self.path}"]:
+            xml = XML(url)
+            self.assertEqual(xml.parse("/aris/lastUpdate"), "1659507301")
+            self.assertEqual(xml.metrics["size"], len(xml1))
+
+        mock_get.assert_not_called()
+
+    def test_get(self):
+        xml = XML(self.path)
+        self.assertEqual(xml._get(), xml1)
+        self.assertNotIn("ttfb", xml.metrics)
+        self.assertIn("transfer", xml.metrics)
+
+    def test_parse_stream(self):
+        for partial in [False, True]:
+            xml = XML(
+                self.path, stream=True, partial=partial,
+                xpaths=["/aris/lastUpdate"]
+            )
+            self.assertEqual(xml.parse("/aris/lastUpdate"), "1659507301")
+
+    def test_parse_compressed(self):
+        path = os.path.join(self.tempdir, "status.xml.gz")
+        with open(path, "wb") as f:
+            f.write(gzip.compress(xml1))
+
+        for stream in [False, True]:
+            xml = XML(path, stream=stream, xpaths=["/aris/lastUpdate"])
+            self.assertEqual(xml.parse("/aris/lastUpdate"), "1659507301")
+
+    def test_parse_missing_file(self):
+        path = os.path.join(self.tempdir, "missing.xml")
+        for stream in [False, True]:
+            xml = XML(path, stream=stream)
+            with self.assertRaises(CriticalException) as context:
+                xml.parse()
+
+            self.assertEqual(
+                context.exception.__str__(),
+                f"[Errno 2] No such file or directory: '{path}'"
+            )
+
+    def test_parse_if_wrong_format(self):
+        with open(self.path, "wb") as f:
+            f.write(b"")
+
+        with self.assertRaises(CriticalException) as context:
+            XML(self.path).parse()
+
+        self.assertTrue(
+            context.exception.__str__().startswith("Unable to parse xml")
+        )
+
+    def test_tree_reused_until_modified(self):
+        tree = xml_module.get_file_tree(self.path)
+        self.assertIs(xml_module.get_file_tree(self.path), tree)
+
+        with open(self.path, "wb") as f:
+            f.write(xml1.replace(b"1659507301", b"1659507302"))
+
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNot(xml_module.get_file_tree(self.path), tree)
+        self.assertEqual(
+            XML(self.path).parse("/aris/lastUpdate"), "1659507302"
+        )
+
+    @patch("argo_probe_xml.treecache.estimate_size", return_value=1)
+    def test_tree_kept_only_if_reusable(self, mock_estimate):
+        XML(self.path).parse()
+        self.assertEqual(len(xml_module._tree_cache), 0)
+        mock_estimate.assert_not_called()
+
+        for kwargs in [{"keep_files": True}, {"tree_ttl": 60}]:
+            xml_module._tree_cache.clear()
+            XML(self.path, **kwargs).parse()
+            self.assertEqual(len(xml_module._tree_cache), 1)
+
+
 class XMLParseTests(unittest.TestCase):
     def setUp(self):
         self.xml1 = XML("https://mock1.url.com")
@@ -206,13 +1035,159 @@ class XMLParseTests(unittest.TestCase):
 
         self.assertIn("Unable to parse xml: ", context.exception.__str__())
 
-    @patch("requests.get")
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_parse_fetches_document_once(self, mock_get):
+        mock_get.return_value = xml1
+        self.assertEqual(self.xml1.parse("/aris/lastUpdate"), "1659507301")
+        self.assertEqual(
+            self.xml1.parse("/aris/partition/name"),
+            ["compute", "gpu", "fat", "taskp", "viz", "short", "ml"]
+        )
+        self.assertTrue(self.xml1.parse())
+        mock_get.assert_called_once()
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_parse_error_fetched_once(self, mock_get):
+        mock_get.side_effect = CriticalException("500 BAD REQUEST")
+        with self.assertRaises(CriticalException) as context1:
+            self.xml1.parse("/aris/lastUpdate")
+
+        with self.assertRaises(CriticalException) as context2:
+            self.xml1.parse("/aris/partition/name")
+
+        mock_get.assert_called_once()
+        self.assertEqual(context1.exception.__str__(), "500 BAD REQUEST")
+        self.assertEqual(context2.exception.__str__(), "500 BAD REQUEST")
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_parse_after_reset(self, mock_get):
+        mock_get.side_effect = [xml1, xml2]
+        self.assertTrue(self.xml1.parse())
+        self.xml1.reset()
+        self.assertEqual(
+            self.xml1.parse("/OAI-PMH/Identify/granularity"),
+            "YYYY-MM-DDThh:mm:ssZ"
+        )
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch("argo_probe_xml.xml.XML._get")
+    def test_parse_reuses_tree(self, mock_get):
+        mock_get.side_effect = [xml1, xml2]
+        xml_module._tree_cache.clear()
+
+        try:
+            xml3 = XML("https://mock1.url.com", tree_ttl=60)
+            self.assertEqual(xml3.parse("/aris/lastUpdate"), "1659507301")
+            xml4 = XML("https://mock1.url.com", timeout=10, tree_ttl=60)
+            self.assertEqual(xml4.parse("/aris/lastUpdate"), "1659507301")
+            self.assertEqual(mock_get.call_count, 1)
+            self.assertTrue(self.xml1.parse())
+            self.assertEqual(mock_get.call_count, 2)
+
+        finally:
+            xml_module._tree_cache.clear()
+
+    @patch("requests.Session.get")
     def test_get_data(self, mock_get):
         mock_get.side_effect = mock_response_ok
         data = self.xml1._get()
         self.assertEqual(data, xml1)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
+    def test_get_data_metrics(self, mock_get):
+        mock_get.side_effect = mock_response_ok
+        self.assertEqual(self.xml1.parse("/aris/lastUpdate"), "1659507301")
+        self.assertEqual(
+            sorted(self.xml1.metrics),
+            ["parse", "size", "transfer", "ttfb", "xpath"]
+        )
+        self.assertEqual(self.xml1.metrics["size"], len(xml1))
+        self.assertEqual(list(self.xml1.metrics["xpath"]), ["/aris/lastUpdate"])
+        self.assertTrue(mock_get.call_args[1]["stream"])
+        self.xml1.reset()
+        self.assertEqual(self.xml1.metrics, {})
+
+    @patch("requests.Session.get")
+    def test_iter_get_data_metrics(self, mock_get):
+        mock_get.side_effect = mock_response_ok
+        xml = XML("https://mock1.url.com", stream=True)
+        self.assertEqual(xml.parse("/aris/lastUpdate"), "1659507301")
+        self.assertEqual(
+            sorted(xml.metrics), ["parse", "size", "transfer", "ttfb", "xpath"]
+        )
+        self.assertEqual(xml.metrics["size"], len(xml1))
+
+    @patch("requests.Session.get")
+    def test_get_compressed_data(self, mock_get):
+        mock_get.side_effect = lambda *args, **kwargs: MockResponse(
+            gzip.compress(xml1), status_code=200
+        )
+        self.assertEqual(self.xml1._get(), xml1)
+        self.assertEqual(self.xml1.metrics["size"], len(gzip.compress(xml1)))
+        self.assertEqual(b"".join(self.xml1._iter_get()), xml1)
+
+    @patch("requests.Session.get")
+    def test_get_data_reuses_session(self, mock_get):
+        mock_get.side_effect = mock_response_ok
+        session = requests.Session()
+        xml = XML("https://mock1.url.com", session=session)
+        xml._get()
+        xml._get()
+        self.assertIs(xml.session, session)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch("requests.Session.get")
+    def test_get_data_with_cache(self, mock_get):
+        directory = tempfile.mkdtemp()
+        try:
+            cache = ResponseCache(directory=directory)
+            mock_get.side_effect = [
+                MockResponse(xml1, status_code=200, headers={"ETag": '"1"'}),
+                MockResponse(b"", status_code=304),
+                MockResponse(b"", status_code=304)
+            ]
+            xml = XML("https://mock1.url.com", cache=cache)
+            self.assertEqual(xml._get(), xml1)
+            self.assertEqual(xml.metrics["size"], len(xml1))
+            self.assertEqual(xml._get(), xml1)
+            self.assertEqual(xml.metrics["size"], 0)
+            self.assertEqual(b"".join(xml._iter_get()), xml1)
+            self.assertEqual(xml.metrics["size"], 0)
+            self.assertEqual(
+                mock_get.call_args_list[0][1]["headers"], None
+            )
+            self.assertEqual(
+                mock_get.call_args_list[1][1]["headers"],
+                {"If-None-Match": '"1"'}
+            )
+
+        finally:
+            shutil.rmtree(directory)
+
+    @patch("requests.Session.get")
+    def test_iter_get_data_with_cache(self, mock_get):
+        directory = tempfile.mkdtemp()
+        try:
+            cache = ResponseCache(directory=directory)
+            mock_get.side_effect = [
+                MockResponse(xml2, status_code=200, headers={"ETag": '"2"'}),
+                MockResponse(b"", status_code=304)
+            ]
+            xml = XML("https://mock2.url.com", cache=cache)
+            self.assertEqual(b"".join(xml._iter_get()), xml2)
+            self.assertEqual(b"".join(xml._iter_get()), xml2)
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_get_session(self):
+        session = xml_module.get_session(pool_size=20, max_retries=2)
+        adapter = session.get_adapter("https://mock1.url.com")
+        self.assertIs(session.get_adapter("http://mock1.url.com"), adapter)
+        self.assertEqual(adapter._pool_maxsize, 20)
+        self.assertEqual(adapter.max_retries.total, 2)
+
+    @patch("requests.Session.get")
     def test_get_data_with_exception(self, mock_get):
         mock_get.side_effect = mock_response_500
         self.assertRaises(CriticalException, self.xml1._get)